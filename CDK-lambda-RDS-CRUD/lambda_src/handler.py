@@ -1,83 +1,388 @@
+import base64
 import json
-import boto3
 import psycopg2
+import psycopg2.extensions
 import os
+import time
+import urllib.parse
+import urllib.request
+from http_response import conditional_response, request_body
+from metrics import instrument_handler, phase, timed
+from migrate import run_migrations
 
-def get_db_credentials():
-    client = boto3.client("secretsmanager")
-    secret = json.loads(client.get_secret_value(SecretId=os.environ["DB_SECRET"])["SecretString"])
-    return secret
+# boto3 and psycopg2.extras are imported on first use: with the secrets
+# extension a cold start never needs boto3, and only batches need extras.
 
-def init_db():
-    creds = get_db_credentials()
-    conn = psycopg2.connect(
-        host=creds["host"],
-        database=os.environ.get("DB_NAME", "postgres"),
-        user=creds["username"],
-        password=creds["password"],
-        port=os.environ.get("DB_PORT", "5432")
-    )
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id SERIAL PRIMARY KEY,
-            description TEXT NOT NULL,
-            status TEXT NOT NULL
-        );
-    """)
-    conn.commit()
-    cur.close()
-    conn.close()
+# Seconds cached DB credentials are trusted before re-reading the secret
+SECRET_TTL = float(os.environ.get("DB_SECRET_TTL", "300"))
 
-def lambda_handler(event, context):
-    init_db()
+# DB_SECRET_SOURCE=extension reads the secret from the AWS Parameters and
+# Secrets Lambda Extension over localhost instead of through boto3
+USE_SECRETS_EXTENSION = os.environ.get("DB_SECRET_SOURCE") == "extension"
+SECRETS_EXTENSION_PORT = os.environ.get("PARAMETERS_SECRETS_EXTENSION_HTTP_PORT", "2773")
+
+# DB_AUTH=iam connects with a locally signed IAM token instead of the secret
+# (RDS Proxy with IAM auth); DB_HOST, when set, overrides the secret's host
+USE_IAM_AUTH = os.environ.get("DB_AUTH") == "iam"
+
+# DB_PROXY=true when DB_HOST is an RDS Proxy. The proxy pins a client to one
+# database connection for good after SET, advisory locks, prepared statements,
+# temp tables or statements over 16 KB, and a pinned session can't be shared.
+# The handler avoids all of those except the migration lock, see ensure_schema.
+VIA_PROXY = os.environ.get("DB_PROXY", "false").lower() == "true"
+MAX_STATEMENT_BYTES = 16 * 1024 if VIA_PROXY else None
+
+# Seconds a cached connection may sit idle before we ping it on reuse
+CONN_PING_AFTER = float(os.environ.get("DB_CONN_PING_AFTER", "30"))
+
+# Methods re-run on a fresh connection when the old one drops mid-request
+REPLAYABLE_METHODS = {"GET"}
+
+# Connection kept alive across warm invocations of this container
+_conn = None
+_conn_last_used = 0.0
+conn_stats = {"reused": 0, "reconnected": 0}
+
+# Set DB_MIGRATE_ON_COLD_START=false when migrations run from the deploy step
+MIGRATE_ON_COLD_START = os.environ.get("DB_MIGRATE_ON_COLD_START", "true").lower() == "true"
+_schema_ready = not MIGRATE_ON_COLD_START
+
+TASK_COLUMNS = ("id", "description", "status")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 1000
+
+_secrets_client = None
+_rds_client = None
+_secret_cache = {"value": None, "fetched_at": 0.0}
 
-    creds = get_db_credentials()
-    conn = psycopg2.connect(
-        host=creds["host"],
+def get_secrets_client():
+    global _secrets_client
+    if _secrets_client is None:
+        import boto3
+        _secrets_client = boto3.client("secretsmanager")
+    return _secrets_client
+
+def _secret_from_extension(secret_id):
+    url = (f"http://localhost:{SECRETS_EXTENSION_PORT}/secretsmanager/get"
+           f"?secretId={urllib.parse.quote(secret_id)}")
+    request = urllib.request.Request(
+        url, headers={"X-Aws-Parameters-Secrets-Token": os.environ["AWS_SESSION_TOKEN"]})
+    with urllib.request.urlopen(request, timeout=2) as r:
+        return json.loads(r.read())["SecretString"]
+
+def _iam_credentials():
+    global _rds_client
+    with phase("Secret"):
+        if _rds_client is None:
+            import boto3
+            _rds_client = boto3.client("rds")
+        # Signed locally, no network call; valid for 15 minutes, checked only at connect
+        token = _rds_client.generate_db_auth_token(
+            DBHostname=os.environ["DB_HOST"],
+            Port=int(os.environ.get("DB_PORT", "5432")),
+            DBUsername=os.environ["DB_USER"],
+        )
+    return {"host": os.environ["DB_HOST"], "username": os.environ["DB_USER"], "password": token}
+
+def get_db_credentials(force_refresh=False):
+    if USE_IAM_AUTH:
+        return _iam_credentials()
+    age = time.monotonic() - _secret_cache["fetched_at"]
+    if force_refresh or _secret_cache["value"] is None or age > SECRET_TTL:
+        secret_id = os.environ["DB_SECRET"]
+        with phase("Secret"):
+            # The extension keeps its own cache, so a forced refresh after a
+            # rotation has to go straight to Secrets Manager
+            if USE_SECRETS_EXTENSION and not force_refresh:
+                secret_string = _secret_from_extension(secret_id)
+            else:
+                secret_string = get_secrets_client().get_secret_value(SecretId=secret_id)["SecretString"]
+        _secret_cache["value"] = json.loads(secret_string)
+        _secret_cache["fetched_at"] = time.monotonic()
+    return _secret_cache["value"]
+
+def _is_auth_failure(error):
+    # 28P01 invalid_password, 28000 invalid_authorization_specification
+    if getattr(error, "pgcode", None) in ("28P01", "28000"):
+        return True
+    return "authentication failed" in str(error)
+
+@timed("Connect")
+def _open(creds):
+    return psycopg2.connect(
+        host=os.environ.get("DB_HOST") or creds["host"],
         database=os.environ.get("DB_NAME", "postgres"),
         user=creds["username"],
         password=creds["password"],
-        port=os.environ.get("DB_PORT", "5432")
+        port=os.environ.get("DB_PORT", "5432"),
+        # None leaves libpq's default; the proxy requires TLS
+        sslmode=os.environ.get("DB_SSLMODE")
     )
-    cur = conn.cursor()
 
-    method = event.get("httpMethod")
+def connect():
+    try:
+        return _open(get_db_credentials())
+    except psycopg2.OperationalError as e:
+        if not _is_auth_failure(e):
+            raise
+        # The secret was probably rotated after we cached it
+        return _open(get_db_credentials(force_refresh=True))
+
+def close_connection():
+    global _conn
+    if _conn is not None:
+        try:
+            _conn.close()
+        except psycopg2.Error:
+            pass
+    _conn = None
+
+def _is_usable(conn):
+    if conn.closed:
+        return False
+    try:
+        # A previous invocation may have died mid-transaction
+        if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            conn.rollback()
+        elif conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - _conn_last_used > CONN_PING_AFTER:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def get_connection():
+    global _conn, _conn_last_used
+    if _conn is not None and _is_usable(_conn):
+        conn_stats["reused"] += 1
+    else:
+        close_connection()
+        _conn = connect()
+        conn_stats["reconnected"] += 1
+    _conn_last_used = time.monotonic()
+    return _conn
+
+def ensure_schema(conn):
+    """Run pending migrations once per container; returns the connection to use."""
+    global _schema_ready
+    if not _schema_ready:
+        with phase("Migrate"):
+            _, locked = run_migrations(conn)
+        _schema_ready = True
+        if locked and VIA_PROXY:
+            # Taking the advisory lock pinned this proxy session, whether or
+            # not anything was left to apply; start a fresh one
+            close_connection()
+            return get_connection()
+    return conn
+
+def respond(status_code, payload):
+    with phase("Encode"):
+        return {"statusCode": status_code, "body": json.dumps(payload),
+                "headers": {"Content-Type": "application/json"}}
+
+def bad_request(message):
+    return respond(400, {"error": message})
 
-    if method == "GET":
-        cur.execute("SELECT * FROM tasks;")
+def encode_cursor(last_id):
+    raw = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token):
+    padded = token + "=" * (-len(token) % 4)
+    return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+
+def list_tasks(cur, params):
+    try:
+        limit = min(int(params.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        after = decode_cursor(params["after"]) if params.get("after") else 0
+    except (ValueError, KeyError, TypeError):
+        return bad_request("Invalid limit or after token")
+    if limit < 1:
+        return bad_request("limit must be positive")
+
+    columns = list(TASK_COLUMNS)
+    if params.get("fields"):
+        requested = [f.strip() for f in params["fields"].split(",")]
+        if any(f not in TASK_COLUMNS for f in requested):
+            return bad_request(f"fields must be a subset of {', '.join(TASK_COLUMNS)}")
+        # id is always selected because the next cursor is built from it
+        columns = ["id"] + [f for f in requested if f != "id"]
+
+    # Column names come from TASK_COLUMNS only, never from the request
+    query = f"SELECT {', '.join(columns)} FROM tasks WHERE id > %s"
+    args = [after]
+    if params.get("status"):
+        query += " AND status = %s"
+        args.append(params["status"])
+    query += " ORDER BY id LIMIT %s;"
+    args.append(limit + 1)
+
+    with phase("Query"):
+        cur.execute(query, args)
         rows = cur.fetchall()
-        result = [{"id": r[0], "description": r[1], "status": r[2]} for r in rows]
-        cur.close()
-        conn.close()
-        return {"statusCode": 200, "body": json.dumps(result)}
+    items = [dict(zip(columns, r)) for r in rows[:limit]]
+    next_token = encode_cursor(items[-1]["id"]) if len(rows) > limit else None
+    return respond(200, {"items": items, "next": next_token})
 
-    elif method == "POST":
-        body = json.loads(event.get("body", "{}"))
-        cur.execute("INSERT INTO tasks (description, status) VALUES (%s, %s);",
-                    (body["description"], body.get("status", "pending")))
-        conn.commit()
-        cur.close()
-        conn.close()
-        return {"statusCode": 201, "body": json.dumps({"message": "Task created"})}
+# tasks.id is a SERIAL (int4) column
+MAX_TASK_ID = 2 ** 31 - 1
 
-    elif method == "PUT":
-        task_id = event["pathParameters"]["id"]
-        body = json.loads(event.get("body", "{}"))
-        cur.execute("UPDATE tasks SET status=%s WHERE id=%s;", (body["status"], task_id))
-        conn.commit()
-        cur.close()
-        conn.close()
-        return {"statusCode": 200, "body": json.dumps({"message": "Task updated"})}
+def is_text(value):
+    return isinstance(value, str) and value != ""
+
+def parse_task_id(value):
+    # bool is an int subclass and floats would truncate; both are rejected
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if type(value) is not int or not 0 < value <= MAX_TASK_ID:
+        raise ValueError("id must be a positive integer")
+    return value
+
+def parse_batch(operations):
+    """Split operations by kind; anything psycopg2 could not adapt is a 400 here,
+    so one bad operation never aborts the whole batch's transaction."""
+    results = [None] * len(operations)
+    creates, updates, deletes = [], [], []
+    for i, op in enumerate(operations):
+        try:
+            kind = op.get("op")
+            status = op.get("status", "pending" if kind == "create" else None)
+            if kind == "create" and is_text(op.get("description")) and is_text(status):
+                creates.append((i, op["description"], status))
+            elif kind == "update" and is_text(status):
+                updates.append((i, parse_task_id(op["id"]), status))
+            elif kind == "delete":
+                deletes.append((i, parse_task_id(op["id"])))
+            else:
+                results[i] = {"status": 400, "error": "Invalid operation"}
+        except (AttributeError, KeyError, TypeError, ValueError):
+            results[i] = {"status": 400, "error": "Invalid operation"}
+    return results, creates, updates, deletes
+
+def values_page_size(rows):
+    """Rows per execute_values statement; behind the proxy, keep each under 16 KB."""
+    if not MAX_STATEMENT_BYTES or not rows:
+        return MAX_BATCH_SIZE
+    # Generous per-row bound: rendered literals plus quoting, casts and separators
+    widest = max(len(str(row).encode()) for row in rows) + 16
+    return max(1, min(MAX_BATCH_SIZE, (MAX_STATEMENT_BYTES - 512) // widest))
 
-    elif method == "DELETE":
-        task_id = event["pathParameters"]["id"]
-        cur.execute("DELETE FROM tasks WHERE id=%s;", (task_id,))
+def batch_tasks(conn, cur, body):
+    operations = body.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return bad_request("operations must be a non-empty list")
+    if len(operations) > MAX_BATCH_SIZE:
+        return bad_request(f"At most {MAX_BATCH_SIZE} operations per batch")
+
+    results, creates, updates, deletes = parse_batch(operations)
+    from psycopg2.extras import execute_values
+    page_size = values_page_size(creates + updates)
+
+    with phase("Query"):
+        # One transaction for the whole batch: creates, then updates, then deletes
+        if creates:
+            # ORDER BY ord makes SERIAL ids ascend in request order (pages run
+            # in order too), so sorted RETURNING ids line up with the creates list
+            rows = execute_values(cur, """
+                INSERT INTO tasks (description, status)
+                SELECT v.description, v.status FROM (VALUES %s) AS v(ord, description, status)
+                ORDER BY v.ord
+                RETURNING id;
+            """, creates, page_size=page_size, fetch=True)
+            for (i, _, _), task_id in zip(creates, sorted(r[0] for r in rows)):
+                results[i] = {"status": 201, "id": task_id}
+        if updates:
+            rows = execute_values(cur, """
+                UPDATE tasks AS t SET status = v.status
+                FROM (VALUES %s) AS v(ord, id, status)
+                WHERE t.id = v.id
+                RETURNING t.id;
+            """, updates, page_size=page_size, fetch=True)
+            found = {r[0] for r in rows}
+            for i, task_id, _ in updates:
+                results[i] = {"status": 200 if task_id in found else 404, "id": task_id}
+        if deletes:
+            cur.execute("DELETE FROM tasks WHERE id = ANY(%s) RETURNING id;",
+                        ([task_id for _, task_id in deletes],))
+            found = {r[0] for r in cur.fetchall()}
+            for i, task_id in deletes:
+                results[i] = {"status": 200 if task_id in found else 404, "id": task_id}
         conn.commit()
+    return respond(200, {"results": results})
+
+def handle_request(conn, event):
+    cur = conn.cursor()
+    method = event.get("httpMethod")
+    path = event.get("path", "")
+
+    try:
+        if method == "POST" and path.endswith("/tasks/batch"):
+            return batch_tasks(conn, cur, json.loads(request_body(event)))
+
+        elif method == "GET":
+            result = list_tasks(cur, event.get("queryStringParameters") or {})
+            conn.rollback()
+            return conditional_response(result, event)
+
+        elif method == "POST":
+            body = json.loads(request_body(event))
+            with phase("Query"):
+                cur.execute("INSERT INTO tasks (description, status) VALUES (%s, %s) RETURNING id;",
+                            (body["description"], body.get("status", "pending")))
+                task_id = cur.fetchone()[0]
+                conn.commit()
+            return respond(201, {"message": "Task created", "id": task_id})
+
+        elif method == "PUT":
+            task_id = event["pathParameters"]["id"]
+            body = json.loads(request_body(event))
+            with phase("Query"):
+                cur.execute("UPDATE tasks SET status=%s WHERE id=%s;", (body["status"], task_id))
+                conn.commit()
+            return respond(200, {"message": "Task updated"})
+
+        elif method == "DELETE":
+            task_id = event["pathParameters"]["id"]
+            with phase("Query"):
+                cur.execute("DELETE FROM tasks WHERE id=%s;", (task_id,))
+                conn.commit()
+            return respond(200, {"message": "Task deleted"})
+
+        return bad_request("Bad request")
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
         cur.close()
-        conn.close()
-        return {"statusCode": 200, "body": json.dumps({"message": "Task deleted"})}
 
-    cur.close()
-    conn.close()
-    return {"statusCode": 400, "body": json.dumps({"error": "Bad request"})}
+def connection_properties():
+    return {"ConnReused": conn_stats["reused"], "ConnReconnected": conn_stats["reconnected"]}
+
+@instrument_handler("TaskManagerRDS", properties=connection_properties)
+def lambda_handler(event, context):
+    conn = get_connection()
+    try:
+        conn = ensure_schema(conn)
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        # Dropped between the liveness check and the migration check; none of
+        # the request has run yet, so reconnecting is safe for any method
+        if not conn.closed:
+            raise
+        close_connection()
+        conn = ensure_schema(get_connection())
+    try:
+        return handle_request(conn, event)
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        # Replay only reads on a lost connection. A write may have committed
+        # before the drop (e.g. during COMMIT), and errors on a live
+        # connection (QueryCanceled, DeadlockDetected) are not drops at all.
+        if not conn.closed or event.get("httpMethod") not in REPLAYABLE_METHODS:
+            raise
+        close_connection()
+        return handle_request(ensure_schema(get_connection()), event)
@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Any runner (cold start or deploy step) takes this lock before applying migrations
+ADVISORY_LOCK_KEY = 7310452
+
+def load_migrations():
+    migrations = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not name.endswith(".sql"):
+            continue
+        version = int(name.split("_", 1)[0])
+        with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+            migrations.append((version, name, f.read()))
+    return migrations
+
+def applied_versions(cur):
+    cur.execute("SELECT to_regclass('schema_version');")
+    if cur.fetchone()[0] is None:
+        return set()
+    cur.execute("SELECT version FROM schema_version;")
+    return {r[0] for r in cur.fetchall()}
+
+def run_migrations(conn):
+    """Apply pending migrations; returns (applied names, whether the lock was taken).
+
+    Taking the advisory lock pins an RDS Proxy session even when another
+    runner turns out to have applied everything first.
+    """
+    migrations = load_migrations()
+    cur = conn.cursor()
+    try:
+        # Fast path for warm schemas: one read, no lock
+        if {m[0] for m in migrations} <= applied_versions(cur):
+            conn.rollback()
+            return [], False
+
+        cur.execute("SELECT pg_advisory_lock(%s);", (ADVISORY_LOCK_KEY,))
+        try:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+            """)
+            conn.commit()
+            # Re-read under the lock; another runner may have finished meanwhile
+            done = applied_versions(cur)
+            applied = []
+            for version, name, sql in migrations:
+                if version in done:
+                    continue
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s);",
+                            (version, name))
+                conn.commit()
+                applied.append(name)
+                print(f"Applied migration {name}")
+            return applied, True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (ADVISORY_LOCK_KEY,))
+            conn.commit()
+    finally:
+        cur.close()
+
+# Deploy-time migrations (with DB_MIGRATE_ON_COLD_START=false on TaskLambda)
+# run from one of these, before the new code takes traffic:
+#   - a Lambda built from the same asset with handler "migrate.lambda_handler",
+#     invoked once by the pipeline: aws lambda invoke --function-name <fn> out.json
+#   - this file, from a host that can reach the database, with the function's
+#     DB_* environment (DB_SECRET, or DB_AUTH=iam with DB_HOST/DB_USER):
+#         python CDK-lambda-RDS-CRUD/lambda_src/migrate.py
+
+def lambda_handler(event, context):
+    # In the deployed asset the shared modules sit next to this file
+    from handler import get_connection
+    applied, _ = run_migrations(get_connection())
+    return {"statusCode": 200, "body": json.dumps({"applied": applied})}
+
+if __name__ == "__main__":
+    # Outside a package, handler's shared modules live in lambda-shared/
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "lambda-shared"))
+    from handler import connect
+    conn = connect()
+    try:
+        print(json.dumps({"applied": run_migrations(conn)[0]}))
+    finally:
+        conn.close()
@@ -0,0 +1,2 @@
+-- Serves GET /tasks?status=... keyset pages ordered by id
+CREATE INDEX IF NOT EXISTS tasks_status_id_idx ON tasks (status, id);
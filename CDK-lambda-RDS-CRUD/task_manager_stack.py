@@ -9,12 +9,66 @@ from aws_cdk import (
     Duration
 )
 from constructs import Construct
+import json
 import os
+import shutil
+
+DB_USERNAME = "taskadmin"
+
+STACK_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modules shared with the DynamoDB Lambda, copied into the asset at synth time
+SHARED_DIR = os.path.join(STACK_DIR, "..", "lambda-shared")
+
+# RDS Proxy in front of the database: "none" (default), "secret" or "iam",
+# e.g. cdk deploy -c rds_proxy=iam
+PROXY_MODES = ("none", "secret", "iam")
+
+# Lambda sizing, overridable per deploy, e.g.
+#   cdk deploy -c lambda_memory_mb=1024 -c provisioned_concurrency=2 -c reserved_concurrency=20
+# Reserved concurrency caps how many containers (and so DB connections) can
+# exist at once; provisioned concurrency keeps that many initialized on the
+# "live" alias, which API Gateway then invokes.
+LAMBDA_DEFAULTS = {
+    "lambda_memory_mb": 512,
+    "lambda_timeout_s": 30,
+    "provisioned_concurrency": 0,
+    "reserved_concurrency": None,
+}
+
+def context_int(scope, key):
+    value = scope.node.try_get_context(key)
+    if value is None or value == "":
+        return LAMBDA_DEFAULTS[key]
+    return int(value)
+
+def stage_lambda_sources():
+    """Copy lambda_src plus the shared modules into build/lambda_src for the asset."""
+    staged = os.path.join(STACK_DIR, "build", "lambda_src")
+    shutil.rmtree(staged, ignore_errors=True)
+    shutil.copytree(os.path.join(STACK_DIR, "lambda_src"), staged,
+                    ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+    for name in os.listdir(SHARED_DIR):
+        if name.endswith(".py"):
+            shutil.copy2(os.path.join(SHARED_DIR, name), os.path.join(staged, name))
+    return staged
 
 class TaskManagerStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        proxy_mode = self.node.try_get_context("rds_proxy") or "none"
+        if proxy_mode not in PROXY_MODES:
+            raise ValueError(f"rds_proxy must be one of {', '.join(PROXY_MODES)}, got {proxy_mode!r}")
+
+        memory_mb = context_int(self, "lambda_memory_mb")
+        timeout_s = context_int(self, "lambda_timeout_s")
+        provisioned = context_int(self, "provisioned_concurrency")
+        reserved = context_int(self, "reserved_concurrency")
+        if not 128 <= memory_mb <= 10240:
+            raise ValueError("lambda_memory_mb must be between 128 and 10240")
+        if reserved is not None and provisioned > reserved:
+            raise ValueError("provisioned_concurrency cannot exceed reserved_concurrency")
+
         # Create VPC
         vpc = ec2.Vpc(self, "TaskManagerVPC", max_azs=2)
 
@@ -22,13 +76,19 @@ class TaskManagerStack(Stack):
         db_sg = ec2.SecurityGroup(self, "DBSecurityGroup", vpc=vpc)
         lambda_sg = ec2.SecurityGroup(self, "LambdaSecurityGroup", vpc=vpc)
 
-        # Allow Lambda to connect to RDS
-        db_sg.add_ingress_rule(lambda_sg, ec2.Port.tcp(5432), "Allow Lambda to connect to Postgres")
+        if proxy_mode == "none":
+            # Allow Lambda to connect to RDS
+            db_sg.add_ingress_rule(lambda_sg, ec2.Port.tcp(5432), "Allow Lambda to connect to Postgres")
+        else:
+            # Lambda -> proxy -> database; the Lambda never reaches the instance directly
+            proxy_sg = ec2.SecurityGroup(self, "ProxySecurityGroup", vpc=vpc)
+            proxy_sg.add_ingress_rule(lambda_sg, ec2.Port.tcp(5432), "Allow Lambda to connect to RDS Proxy")
+            db_sg.add_ingress_rule(proxy_sg, ec2.Port.tcp(5432), "Allow RDS Proxy to connect to Postgres")
 
         # DB credentials
         db_secret = secrets.Secret(self, "DBSecret",
             generate_secret_string=secrets.SecretStringGenerator(
-                secret_string_template='{"username":"taskadmin"}',  # changed from admin
+                secret_string_template=json.dumps({"username": DB_USERNAME}),  # changed from admin
                 generate_string_key="password",
                 exclude_punctuation=True
             )
@@ -53,38 +113,94 @@ class TaskManagerStack(Stack):
             removal_policy=cdk.RemovalPolicy.DESTROY
         )
 
+        environment = {
+            "DB_SECRET": db_secret.secret_name,
+            "DB_SECRET_SOURCE": "extension",
+            "DB_NAME": "postgres",
+            "DB_PORT": "5432"
+        }
+        # Serves the DB secret over localhost so cold starts skip importing boto3
+        params_and_secrets = _lambda.ParamsAndSecretsLayerVersion.from_version(
+            _lambda.ParamsAndSecretsVersions.V1_0_103
+        )
+
+        proxy = None
+        if proxy_mode != "none":
+            # Pools and multiplexes connections so Lambda concurrency spikes
+            # don't exhaust the t3.micro's max_connections
+            proxy = db_instance.add_proxy("TaskManagerProxy",
+                secrets=[db_secret],
+                vpc=vpc,
+                security_groups=[proxy_sg],
+                iam_auth=proxy_mode == "iam",
+                require_tls=True,
+                # Fail inside the Lambda timeout instead of waiting for a pooled connection
+                borrow_timeout=Duration.seconds(10),
+                max_connections_percent=90,
+                max_idle_connections_percent=50
+            )
+            environment.update({
+                "DB_HOST": proxy.endpoint,
+                "DB_PROXY": "true",
+                "DB_SSLMODE": "require"
+            })
+            if proxy_mode == "iam":
+                # IAM tokens are signed locally, so the Lambda never reads the secret
+                environment = {k: v for k, v in environment.items() if not k.startswith("DB_SECRET")}
+                environment.update({"DB_AUTH": "iam", "DB_USER": DB_USERNAME})
+                params_and_secrets = None
+
         # Lambda function
         lambda_fn = _lambda.Function(self, "TaskLambda",
             runtime=_lambda.Runtime.PYTHON_3_12,
             handler="handler.lambda_handler",
-            code=_lambda.Code.from_asset(os.path.join("lambda_src")),
+            code=_lambda.Code.from_asset(stage_lambda_sources()),
             vpc=vpc,
             security_groups=[lambda_sg],
-            timeout=Duration.seconds(30),
-            memory_size=512,
-            environment={
-                "DB_SECRET": db_secret.secret_name,
-                "DB_NAME": "postgres",
-                "DB_PORT": "5432"
-            }
+            timeout=Duration.seconds(timeout_s),
+            memory_size=memory_mb,
+            reserved_concurrent_executions=reserved,
+            params_and_secrets=params_and_secrets,
+            environment=environment
         )
 
-        db_secret.grant_read(lambda_fn)
+        if proxy_mode == "iam":
+            proxy.grant_connect(lambda_fn, DB_USERNAME)
+        else:
+            db_secret.grant_read(lambda_fn)
+
+        # Provisioned concurrency only applies to a version or alias, so the
+        # API targets the alias whenever it is enabled
+        target = lambda_fn
+        if provisioned > 0:
+            target = _lambda.Alias(self, "TaskLambdaLive",
+                alias_name="live",
+                version=lambda_fn.current_version,
+                provisioned_concurrent_executions=provisioned
+            )
 
         # API Gateway
         api = apigw.RestApi(self, "TaskManagerAPI",
-            rest_api_name="Task Manager Service"
+            rest_api_name="Task Manager Service",
+            # Compressed GET /tasks bodies are returned base64-encoded and only
+            # decoded to bytes for binary media types
+            binary_media_types=["*/*"]
         )
 
         tasks = api.root.add_resource("tasks")
-        tasks.add_method("GET", apigw.LambdaIntegration(lambda_fn))
-        tasks.add_method("POST", apigw.LambdaIntegration(lambda_fn))
+        tasks.add_method("GET", apigw.LambdaIntegration(target))
+        tasks.add_method("POST", apigw.LambdaIntegration(target))
 
         task_id = tasks.add_resource("{id}")
-        task_id.add_method("PUT", apigw.LambdaIntegration(lambda_fn))
-        task_id.add_method("DELETE", apigw.LambdaIntegration(lambda_fn))
+        task_id.add_method("PUT", apigw.LambdaIntegration(target))
+        task_id.add_method("DELETE", apigw.LambdaIntegration(target))
+
+        batch = tasks.add_resource("batch")
+        batch.add_method("POST", apigw.LambdaIntegration(target))
 
         # Outputs
         cdk.CfnOutput(self, "APIEndpoint", value=api.url)
         cdk.CfnOutput(self, "DBEndpoint", value=db_instance.db_instance_endpoint_address)
         cdk.CfnOutput(self, "DBSecretArn", value=db_secret.secret_arn)
+        if proxy is not None:
+            cdk.CfnOutput(self, "DBProxyEndpoint", value=proxy.endpoint)
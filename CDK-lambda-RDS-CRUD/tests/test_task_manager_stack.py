@@ -0,0 +1,145 @@
+import os
+import sys
+
+import aws_cdk as cdk
+import pytest
+from aws_cdk.assertions import Match, Template
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_manager_stack import TaskManagerStack
+
+_templates = {}
+
+def synth(**context):
+    # Synthesizing is slow; every test of one context shares a template
+    key = tuple(sorted(context.items()))
+    if key not in _templates:
+        app = cdk.App(context=context)
+        stack = TaskManagerStack(app, "TestStack",
+            env=cdk.Environment(account="123456789012", region="us-east-1"))
+        _templates[key] = Template.from_stack(stack)
+    return _templates[key]
+
+def logical_id(template, resource_type, path_fragment):
+    """Logical id of the one resource of `resource_type` whose id contains `path_fragment`."""
+    ids = [i for i in template.find_resources(resource_type) if path_fragment in i]
+    assert len(ids) == 1, f"{resource_type} {path_fragment}: {ids}"
+    return ids[0]
+
+def task_lambda(template):
+    functions = template.find_resources("AWS::Lambda::Function",
+        {"Properties": {"Handler": "handler.lambda_handler"}})
+    assert len(functions) == 1
+    return next(iter(functions.items()))
+
+def ingress_rules(template):
+    """(target group, source group) for every group-to-group ingress rule."""
+    rules = set()
+    for resource in template.find_resources("AWS::EC2::SecurityGroupIngress").values():
+        props = resource["Properties"]
+        if "SourceSecurityGroupId" in props:
+            rules.add((props["GroupId"]["Fn::GetAtt"][0], props["SourceSecurityGroupId"]["Fn::GetAtt"][0]))
+    return rules
+
+def has_secrets_extension(template):
+    _, function = task_lambda(template)
+    return any("parameters-and-secrets" in str(layer).lower() for layer in function["Properties"].get("Layers", []))
+
+def lambda_actions(template):
+    """Every IAM action granted to the task Lambda's execution role."""
+    _, function = task_lambda(template)
+    role = function["Properties"]["Role"]["Fn::GetAtt"][0]
+    actions = set()
+    for policy in template.find_resources("AWS::IAM::Policy").values():
+        if {"Ref": role} not in policy["Properties"]["Roles"]:
+            continue
+        for statement in policy["Properties"]["PolicyDocument"]["Statement"]:
+            action = statement["Action"]
+            actions.update([action] if isinstance(action, str) else action)
+    return actions
+
+@pytest.mark.parametrize("mode, proxies", [("none", 0), ("secret", 1), ("iam", 1)])
+def test_proxy_only_in_proxy_modes(mode, proxies):
+    synth(rds_proxy=mode).resource_count_is("AWS::RDS::DBProxy", proxies)
+
+@pytest.mark.parametrize("mode, iam_auth", [("secret", "DISABLED"), ("iam", "REQUIRED")])
+def test_proxy_settings(mode, iam_auth):
+    synth(rds_proxy=mode).has_resource_properties("AWS::RDS::DBProxy", {
+        "RequireTLS": True,
+        "Auth": [Match.object_like({"AuthScheme": "SECRETS", "IAMAuth": iam_auth})],
+    })
+
+def test_lambda_reaches_database_directly_without_proxy():
+    template = synth(rds_proxy="none")
+    db_sg = logical_id(template, "AWS::EC2::SecurityGroup", "DBSecurityGroup")
+    lambda_sg = logical_id(template, "AWS::EC2::SecurityGroup", "LambdaSecurityGroup")
+    assert ingress_rules(template) == {(db_sg, lambda_sg)}
+
+@pytest.mark.parametrize("mode", ["secret", "iam"])
+def test_lambda_reaches_database_only_through_proxy(mode):
+    template = synth(rds_proxy=mode)
+    db_sg = logical_id(template, "AWS::EC2::SecurityGroup", "DBSecurityGroup")
+    lambda_sg = logical_id(template, "AWS::EC2::SecurityGroup", "LambdaSecurityGroup")
+    proxy_sg = logical_id(template, "AWS::EC2::SecurityGroup", "ProxySecurityGroup")
+    # No Lambda -> DB rule: the instance only accepts the proxy
+    assert ingress_rules(template) == {(proxy_sg, lambda_sg), (db_sg, proxy_sg)}
+
+def test_environment_without_proxy():
+    _, function = task_lambda(synth(rds_proxy="none"))
+    env = function["Properties"]["Environment"]["Variables"]
+    assert env["DB_SECRET_SOURCE"] == "extension"
+    assert "DB_SECRET" in env
+    for name in ("DB_HOST", "DB_PROXY", "DB_AUTH", "DB_SSLMODE"):
+        assert name not in env
+
+@pytest.mark.parametrize("mode", ["secret", "iam"])
+def test_environment_points_at_proxy(mode):
+    template = synth(rds_proxy=mode)
+    proxy = logical_id(template, "AWS::RDS::DBProxy", "TaskManagerProxy")
+    _, function = task_lambda(template)
+    env = function["Properties"]["Environment"]["Variables"]
+    assert env["DB_HOST"] == {"Fn::GetAtt": [proxy, "Endpoint"]}
+    assert env["DB_PROXY"] == "true"
+    assert env["DB_SSLMODE"] == "require"
+    if mode == "iam":
+        assert env["DB_AUTH"] == "iam"
+        assert env["DB_USER"] == "taskadmin"
+        assert not any(name.startswith("DB_SECRET") for name in env)
+    else:
+        assert "DB_AUTH" not in env
+        assert "DB_SECRET" in env
+
+@pytest.mark.parametrize("mode", ["none", "secret"])
+def test_secret_modes_read_the_secret(mode):
+    template = synth(rds_proxy=mode)
+    actions = lambda_actions(template)
+    assert "secretsmanager:GetSecretValue" in actions
+    assert "rds-db:connect" not in actions
+    assert has_secrets_extension(template)
+
+def test_iam_mode_connects_without_the_secret():
+    template = synth(rds_proxy="iam")
+    actions = lambda_actions(template)
+    assert "rds-db:connect" in actions
+    assert not any(action.startswith("secretsmanager:") for action in actions)
+    # The Secrets extension layer is only there to serve the secret
+    assert not has_secrets_extension(template)
+
+def test_tuned_sizing():
+    template = synth(rds_proxy="iam", lambda_memory_mb="1024", lambda_timeout_s="20",
+                     provisioned_concurrency="2", reserved_concurrency="20")
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "handler.lambda_handler",
+        "MemorySize": 1024,
+        "Timeout": 20,
+        "ReservedConcurrentExecutions": 20,
+    })
+    template.has_resource_properties("AWS::Lambda::Alias", {
+        "Name": "live",
+        "ProvisionedConcurrencyConfig": {"ProvisionedConcurrentExecutions": 2},
+    })
+
+def test_invalid_proxy_mode_is_rejected():
+    with pytest.raises(ValueError):
+        synth(rds_proxy="pgbouncer")
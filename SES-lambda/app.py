@@ -1,5 +1,10 @@
+import json
+import os
+import time
 import boto3
 from botocore.exceptions import ClientError
+from bulk import put_template, send_bulk
+from sqs_consumer import process_records
 
 ses_client = boto3.client('ses', region_name='us-east-1')
 
@@ -17,7 +22,68 @@ BODY_HTML = """<html>
 </body>
 </html>"""
 
+# Bulk and SQS mode settings
+BULK_MAX_WORKERS = int(os.environ.get("BULK_MAX_WORKERS", "8"))
+# Stop starting SES calls this long before the Lambda timeout
+BULK_DEADLINE_MARGIN_MS = int(os.environ.get("BULK_DEADLINE_MARGIN_MS", "10000"))
+
+def deadline_from(context):
+    if context is None:
+        return None
+    remaining_ms = context.get_remaining_time_in_millis()
+    # Never more than a quarter of the time left, so short timeouts (the 3s
+    # default) still send instead of starting past the deadline
+    margin_ms = min(BULK_DEADLINE_MARGIN_MS, remaining_ms // 4)
+    return time.monotonic() + (remaining_ms - margin_ms) / 1000
+
+def load_destinations(event):
+    # Async invoke payloads cap at 256 KB, so large lists are read from S3
+    if "destinations_s3" in event:
+        location = event["destinations_s3"]
+        body = boto3.client("s3").get_object(Bucket=location["bucket"], Key=location["key"])["Body"]
+        return json.loads(body.read())
+    return event.get("destinations") or []
+
+def send_bulk_campaign(event, context):
+    """Event: {"mode": "bulk", "template": name, "destinations": [...] | "destinations_s3": {...},
+    "default_data": {...}, "template_content": {"subject", "html", "text"} (optional)}"""
+    template = event["template"]
+    if event.get("template_content"):
+        content = event["template_content"]
+        put_template(ses_client, template, content["subject"], content["html"], content.get("text"))
+
+    result = send_bulk(ses_client, event.get("source", SENDER), template, load_destinations(event),
+                       default_data=event.get("default_data"), deadline=deadline_from(context),
+                       max_workers=BULK_MAX_WORKERS)
+    for entry in result["invalid"]:
+        print(json.dumps({"destination": entry["index"], "error": entry["error"]}))
+    for batch in result["batches"]:
+        print(json.dumps({"batch": batch["batch"], "sent": batch["sent"], "failed": len(batch["failed"]),
+                          "unsent": len(batch["unsent"]), "attempts": batch["attempts"]}))
+    print(f"Bulk send done: {result['sent']} sent, {result['failed']} failed, {result['unsent']} unsent")
+    if result["failed"] or result["unsent"]:
+        status = "partial" if result["sent"] else "error"
+    else:
+        status = "success"
+    return {"status": status, **result}
+
+def is_sqs_event(event):
+    records = event.get("Records") if isinstance(event, dict) else None
+    return bool(records) and records[0].get("eventSource") == "aws:sqs"
+
 def lambda_handler(event, context):
+    # SQS event source mapping; needs FunctionResponseTypes=["ReportBatchItemFailures"]
+    if is_sqs_event(event):
+        return process_records(ses_client, event["Records"], SENDER, deadline=deadline_from(context),
+                               max_workers=BULK_MAX_WORKERS)
+
+    if isinstance(event, dict) and event.get("mode") == "bulk":
+        try:
+            return send_bulk_campaign(event, context)
+        except ClientError as e:
+            print("Error:", e.response['Error']['Message'])
+            return {"status": "error", "message": e.response['Error']['Message']}
+
     try:
         response = ses_client.send_email(
             Source=SENDER,
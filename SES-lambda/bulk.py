@@ -0,0 +1,173 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+# SendBulkTemplatedEmail accepts at most 50 destinations per call
+MAX_DESTINATIONS_PER_CALL = 50
+MAX_RETRIES = 5
+
+# Whole-call errors worth retrying; anything else fails the batch
+RETRYABLE_ERRORS = {"Throttling", "ThrottlingException", "ServiceUnavailable", "InternalFailure"}
+# Per-destination statuses worth retrying; the rest are final
+RETRYABLE_STATUSES = {"AccountThrottled", "TransientFailure"}
+
+class TokenBucket:
+    """Thread-safe limiter handing out one token per recipient at `rate` per second.
+
+    A request larger than the bucket runs it into debt and waits it off, so a
+    50-recipient call still works on a 1/s sandbox account.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n, deadline):
+        """Block until `n` tokens are ours; False (nothing taken) if that would pass `deadline`."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (n - self.tokens) / self.rate)
+            if now + wait > deadline:
+                return False
+            self.tokens -= n
+        if wait:
+            time.sleep(wait)
+        return True
+
+def chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+def backoff_delay(attempt):
+    # Full jitter, capped at 5s
+    return random.uniform(0, min(5.0, 0.2 * 2 ** attempt))
+
+def recipient_count(destination):
+    # The send rate is counted per recipient, not per API call
+    d = destination["Destination"]
+    return sum(len(d.get(k, [])) for k in ("ToAddresses", "CcAddresses", "BccAddresses"))
+
+def to_ses_destination(destination):
+    """Accept "user@example.com" or {"to": [...], "cc": [...], "bcc": [...], "data": {...}}."""
+    if isinstance(destination, str):
+        destination = {"to": [destination]}
+    if not isinstance(destination, dict):
+        raise ValueError("destination must be an address or an object")
+    to = destination.get("to") or []
+    to = [to] if isinstance(to, str) else list(to)
+    # SES rejects the whole call for one destination without a recipient
+    if not to or not all(isinstance(address, str) and address for address in to):
+        raise ValueError("destination needs a non-empty 'to' list of addresses")
+    ses_destination = {"Destination": {"ToAddresses": to}}
+    for key, field in (("cc", "CcAddresses"), ("bcc", "BccAddresses")):
+        if destination.get(key):
+            ses_destination["Destination"][field] = list(destination[key])
+    if destination.get("data"):
+        ses_destination["ReplacementTemplateData"] = json.dumps(destination["data"])
+    return ses_destination
+
+def put_template(ses_client, name, subject, html, text=None):
+    template = {"TemplateName": name, "SubjectPart": subject, "HtmlPart": html}
+    if text:
+        template["TextPart"] = text
+    try:
+        ses_client.update_template(Template=template)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TemplateDoesNotExist":
+            raise
+        ses_client.create_template(Template=template)
+
+def send_batch(ses_client, bucket, batch_no, destinations, request, deadline):
+    """Send one batch of at most 50 destinations, retrying the throttled ones.
+
+    Failed and unsent entries carry "index", the destination's position in
+    `destinations`, so callers can map them back to their own records.
+    """
+    result = {"batch": batch_no, "sent": 0, "message_ids": [], "failed": [], "unsent": [], "attempts": 0}
+    pending = list(range(len(destinations)))
+    for attempt in range(MAX_RETRIES + 1):
+        if not bucket.acquire(sum(recipient_count(destinations[i]) for i in pending), deadline):
+            break
+        result["attempts"] += 1
+        try:
+            response = ses_client.send_bulk_templated_email(
+                Destinations=[destinations[i] for i in pending], **request)
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code not in RETRYABLE_ERRORS:
+                result["failed"].extend({"index": i, "to": destinations[i]["Destination"]["ToAddresses"],
+                                         "status": code, "error": e.response["Error"]["Message"]}
+                                        for i in pending)
+                pending = []
+                break
+        else:
+            retry = []
+            for i, status in zip(pending, response["Status"]):
+                code = status.get("Status", "Success" if "MessageId" in status else "Failed")
+                if code == "Success":
+                    result["sent"] += 1
+                    result["message_ids"].append(status["MessageId"])
+                elif code in RETRYABLE_STATUSES:
+                    retry.append(i)
+                else:
+                    result["failed"].append({"index": i, "to": destinations[i]["Destination"]["ToAddresses"],
+                                             "status": code, "error": status.get("Error")})
+            pending = retry
+        if not pending:
+            break
+        delay = backoff_delay(attempt)
+        if time.monotonic() + delay > deadline:
+            break
+        time.sleep(delay)
+
+    # Whatever is left ran out of retries or time; report it so it can be resubmitted
+    result["unsent"] = [{"index": i, "to": destinations[i]["Destination"]["ToAddresses"]} for i in pending]
+    return result
+
+def send_bulk(ses_client, source, template, destinations, default_data=None, deadline=None,
+              max_workers=8, max_send_rate=None, **extra):
+    """Send `template` to every destination in 50-recipient calls across a thread pool.
+
+    The pool shares one token bucket sized from the account's MaxSendRate, so
+    adding workers only hides call latency and never exceeds the quota.
+    Batches that cannot start or finish before `deadline` (a time.monotonic()
+    value) are reported as unsent rather than cut off mid-call by Lambda.
+    Malformed destinations are left out of the calls and listed in "invalid"
+    by their position in `destinations`.
+    """
+    if max_send_rate is None:
+        max_send_rate = ses_client.get_send_quota()["MaxSendRate"]
+    bucket = TokenBucket(max_send_rate)
+    deadline = deadline if deadline is not None else float("inf")
+    request = {"Source": source, "Template": template,
+               "DefaultTemplateData": json.dumps(default_data or {}), **extra}
+
+    valid, invalid = [], []
+    for i, destination in enumerate(destinations):
+        try:
+            valid.append(to_ses_destination(destination))
+        except ValueError as e:
+            invalid.append({"index": i, "error": str(e)})
+
+    batches = list(chunks(valid, MAX_DESTINATIONS_PER_CALL))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(
+            lambda numbered: send_batch(ses_client, bucket, numbered[0], numbered[1], request, deadline),
+            enumerate(batches)))
+
+    return {
+        "sent": sum(r["sent"] for r in results),
+        "failed": sum(len(r["failed"]) for r in results) + len(invalid),
+        "unsent": sum(len(r["unsent"]) for r in results),
+        "max_send_rate": max_send_rate,
+        "invalid": invalid,
+        "batches": results,
+    }
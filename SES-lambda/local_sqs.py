@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Drive the SES Lambda's SQS consumer locally against moto's SES and SQS.
+
+Queues a mix of templated, plain and broken messages, then plays the
+Lambda event source mapping: receive up to 10 messages, invoke
+lambda_handler, delete everything not listed in batchItemFailures. Failed
+records are redelivered until maxReceiveCount moves them to the DLQ.
+
+    pip install "moto[ses,sqs]"
+    python local_sqs.py --messages 200 --rate 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+
+from moto import mock_aws
+
+class LocalContext:
+    def __init__(self, timeout_s):
+        self._deadline = time.monotonic() + timeout_s
+
+    def get_remaining_time_in_millis(self):
+        return int(max(0.0, self._deadline - time.monotonic()) * 1000)
+
+def make_messages(n, rng):
+    messages = []
+    for i in range(n):
+        kind = rng.random()
+        if kind < 0.6:
+            messages.append({"template": "digest", "to": f"user{i}@example.com", "data": {"name": f"user {i}"}})
+        elif kind < 0.95:
+            messages.append({"to": f"user{i}@example.com", "subject": "Your task update",
+                             "html": f"<p>Task {i} changed</p>"})
+        elif kind < 0.98:
+            # Unverified sender: SES rejects it on every attempt
+            messages.append({"to": f"user{i}@example.com", "subject": "Hi", "text": "Hi",
+                             "source": "unverified@example.com"})
+        else:
+            messages.append("not a message")
+    return messages
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=200.0, help="recipients per second (SES_SEND_RATE)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="simulated Lambda timeout in seconds")
+    parser.add_argument("--max-receive-count", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    os.environ["SES_SEND_RATE"] = str(args.rate)
+
+    with mock_aws():
+        import boto3
+        ses = boto3.client("ses")
+        ses.verify_email_identity(EmailAddress="new-sender@example.com")
+        ses.create_template(Template={"TemplateName": "digest", "SubjectPart": "Digest for {{name}}",
+                                      "HtmlPart": "<p>Hello {{name}}</p>"})
+        sqs = boto3.client("sqs")
+        dlq_url = sqs.create_queue(QueueName="email-requests-dlq")["QueueUrl"]
+        dlq_arn = sqs.get_queue_attributes(QueueUrl=dlq_url, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+        queue_url = sqs.create_queue(QueueName="email-requests", Attributes={
+            "VisibilityTimeout": "0",
+            "RedrivePolicy": json.dumps({"deadLetterTargetArn": dlq_arn,
+                                         "maxReceiveCount": str(args.max_receive_count)}),
+        })["QueueUrl"]
+        queue_arn = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["QueueArn"])["Attributes"]["QueueArn"]
+
+        for message in make_messages(args.messages, random.Random(args.seed)):
+            sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps(message))
+
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import app
+
+        invocations = deleted = reported = 0
+        started = time.monotonic()
+        while True:
+            received = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10,
+                                           AttributeNames=["ApproximateReceiveCount"]).get("Messages", [])
+            if not received:
+                break
+            event = {"Records": [{
+                "messageId": m["MessageId"], "receiptHandle": m["ReceiptHandle"], "body": m["Body"],
+                "attributes": m.get("Attributes", {}), "eventSource": "aws:sqs", "eventSourceARN": queue_arn,
+            } for m in received]}
+            result = app.lambda_handler(event, LocalContext(args.timeout))
+            invocations += 1
+            failures = {f["itemIdentifier"] for f in result["batchItemFailures"]}
+            reported += len(failures)
+            for m in received:
+                if m["MessageId"] not in failures:
+                    sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=m["ReceiptHandle"])
+                    deleted += 1
+
+        in_dlq = int(sqs.get_queue_attributes(QueueUrl=dlq_url, AttributeNames=["ApproximateNumberOfMessages"])
+                     ["Attributes"]["ApproximateNumberOfMessages"])
+        sent = ses.get_send_statistics()["SendDataPoints"]
+        print(f"\n{invocations} invocations in {time.monotonic() - started:.1f}s: {deleted} messages sent and "
+              f"deleted, {reported} failures reported, {in_dlq} in the DLQ")
+        print(f"SES delivery attempts recorded: {sum(p['DeliveryAttempts'] for p in sent)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from bulk import (MAX_DESTINATIONS_PER_CALL, MAX_RETRIES, RETRYABLE_ERRORS, TokenBucket, backoff_delay,
+                  chunks, recipient_count, send_batch, to_ses_destination)
+
+CHARSET = "UTF-8"
+
+# Recipients per second this container may send. Every concurrent container
+# has its own bucket, so with N consumers set this to MaxSendRate / N
+# (or cap the event source mapping's MaximumConcurrency). Default: the
+# account's MaxSendRate.
+SES_SEND_RATE = os.environ.get("SES_SEND_RATE")
+SEND_QUOTA_TTL = 300
+
+# Kept across warm invocations so back-to-back batches share one budget
+_bucket = None
+_bucket_created_at = 0.0
+
+def get_bucket(ses_client):
+    global _bucket, _bucket_created_at
+    if _bucket is None or time.monotonic() - _bucket_created_at > SEND_QUOTA_TTL:
+        rate = float(SES_SEND_RATE) if SES_SEND_RATE else ses_client.get_send_quota()["MaxSendRate"]
+        if _bucket is None or _bucket.rate != rate:
+            _bucket = TokenBucket(rate)
+        _bucket_created_at = time.monotonic()
+    return _bucket
+
+def parse_message(body):
+    """A record body is a templated message {"template", "to", "data", "default_data"}
+    or a plain one {"to", "subject", "html" and/or "text"}; both take "cc", "bcc", "source"."""
+    message = json.loads(body)
+    if not isinstance(message, dict) or not message.get("to"):
+        raise ValueError("message needs a 'to'")
+    if not message.get("template") and not (message.get("subject") and (message.get("html") or message.get("text"))):
+        raise ValueError("message needs a 'template', or a 'subject' and 'html'/'text'")
+    return message
+
+def send_message(ses_client, bucket, message, source, deadline):
+    destination = to_ses_destination(message)
+    body = {}
+    if message.get("html"):
+        body["Html"] = {"Data": message["html"], "Charset": CHARSET}
+    if message.get("text"):
+        body["Text"] = {"Data": message["text"], "Charset": CHARSET}
+    for attempt in range(MAX_RETRIES + 1):
+        if not bucket.acquire(recipient_count(destination), deadline):
+            return "Deadline reached"
+        try:
+            ses_client.send_email(
+                Source=message.get("source", source),
+                Destination=destination["Destination"],
+                Message={"Subject": {"Data": message["subject"], "Charset": CHARSET}, "Body": body},
+            )
+            return None
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in RETRYABLE_ERRORS:
+                return e.response["Error"]["Message"]
+        delay = backoff_delay(attempt)
+        if time.monotonic() + delay > deadline:
+            return "Deadline reached"
+        time.sleep(delay)
+    return "Retries exhausted"
+
+def process_records(ses_client, records, default_source, deadline=None, max_workers=8):
+    """Send one SQS batch and return the Lambda partial batch response.
+
+    Templated messages sharing a source, template and default data are
+    merged into SendBulkTemplatedEmail calls of up to 50; plain messages go
+    out one send_email each. Everything runs concurrently under the shared
+    send-rate bucket. Records that fail or miss the deadline are listed in
+    batchItemFailures so SQS redelivers only those; malformed ones fail
+    too and reach the dead-letter queue after maxReceiveCount.
+    Meant for standard queues: concurrent sends do not keep FIFO order.
+    """
+    deadline = deadline if deadline is not None else float("inf")
+    failed = set()
+    groups = {}  # (source, template, default data) -> [(messageId, SES destination)]
+    singles = []  # (messageId, message)
+    for record in records:
+        try:
+            message = parse_message(record["body"])
+            destination = to_ses_destination(message)
+        except (ValueError, TypeError) as e:
+            print(json.dumps({"messageId": record["messageId"], "error": f"Malformed message: {e}"}))
+            failed.add(record["messageId"])
+            continue
+        if message.get("template"):
+            key = (message.get("source", default_source), message["template"],
+                   json.dumps(message.get("default_data") or {}, sort_keys=True))
+            groups.setdefault(key, []).append((record["messageId"], destination))
+        else:
+            singles.append((record["messageId"], message))
+
+    if not groups and not singles:
+        return {"batchItemFailures": [{"itemIdentifier": r["messageId"]} for r in records]}
+
+    bucket = get_bucket(ses_client)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        batch_jobs = []
+        for (source, template, default_data), members in groups.items():
+            request = {"Source": source, "Template": template, "DefaultTemplateData": default_data}
+            for batch in chunks(members, MAX_DESTINATIONS_PER_CALL):
+                future = pool.submit(send_batch, ses_client, bucket, len(batch_jobs),
+                                     [destination for _, destination in batch], request, deadline)
+                batch_jobs.append((batch, future))
+        single_jobs = [(message_id, pool.submit(send_message, ses_client, bucket, message, default_source, deadline))
+                       for message_id, message in singles]
+
+    for batch, future in batch_jobs:
+        try:
+            result = future.result()
+        except Exception as e:
+            print(json.dumps({"error": f"Batch failed: {e!r}", "records": len(batch)}))
+            failed.update(message_id for message_id, _ in batch)
+            continue
+        for entry in result["failed"] + result["unsent"]:
+            failed.add(batch[entry["index"]][0])
+            print(json.dumps({"messageId": batch[entry["index"]][0], "error": entry.get("error") or "Unsent"}))
+    for message_id, future in single_jobs:
+        try:
+            error = future.result()
+        except Exception as e:
+            error = repr(e)
+        if error:
+            failed.add(message_id)
+            print(json.dumps({"messageId": message_id, "error": error}))
+
+    print(f"SQS batch: {len(records) - len(failed)} sent, {len(failed)} failed")
+    # Keep the records' order; SQS only needs the identifiers
+    return {"batchItemFailures": [{"itemIdentifier": r["messageId"]} for r in records
+                                  if r["messageId"] in failed]}
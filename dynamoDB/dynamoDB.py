@@ -1,6 +1,7 @@
 import boto3
 from datetime import datetime
-import time
+from sharding import USER_SHARD_COUNT, created_at_now, query_user_records, shard_key
+from user_queries import EMAIL_INDEX, EMAIL_SORT_INDEX, email_bucket, iter_users_by_email
 
 # ----------------------------
 # 1. Initialize DynamoDB
@@ -23,14 +24,24 @@ def create_table():
         AttributeDefinitions=[
             {'AttributeName': 'user_id', 'AttributeType': 'S'},
             {'AttributeName': 'created_at', 'AttributeType': 'S'},
-            {'AttributeName': 'email', 'AttributeType': 'S'}  # For GSI
+            {'AttributeName': 'email', 'AttributeType': 'S'},  # For GSI
+            {'AttributeName': 'email_bucket', 'AttributeType': 'S'}  # For ordered GSI
         ],
         GlobalSecondaryIndexes=[
             {
-                'IndexName': 'EmailIndex',
+                'IndexName': EMAIL_INDEX,
                 'KeySchema': [{'AttributeName': 'email', 'KeyType': 'HASH'}],
                 'Projection': {'ProjectionType': 'ALL'},
                 'ProvisionedThroughput': {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+            },
+            {
+                'IndexName': EMAIL_SORT_INDEX,
+                'KeySchema': [
+                    {'AttributeName': 'email_bucket', 'KeyType': 'HASH'},
+                    {'AttributeName': 'email', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+                'ProvisionedThroughput': {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
             }
         ],
         ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
@@ -45,12 +56,15 @@ table = create_table()
 # 3. Add Users
 # ----------------------------
 def add_user(user_id, name, email):
+    created_at = created_at_now()  # nanosecond timestamp as sort key
     table.put_item(
         Item={
-            'user_id': user_id,
-            'created_at': str(int(time.time())),  # timestamp as sort key
+            # "<user_id>#<shard>" when USER_SHARD_COUNT > 1, see sharding.py
+            'user_id': shard_key(user_id, created_at),
+            'created_at': created_at,
             'name': name,
-            'email': email
+            'email': email,
+            'email_bucket': email_bucket(email)
         }
     )
     print(f"Added user {name}")
@@ -62,19 +76,22 @@ add_user('1', 'Melhem2', 'melhem2@example.com')  # Same user_id, different sort
 # ----------------------------
 # 4. List users sorted by email
 # ----------------------------
-def list_users_sorted_by_email():
-    users = []
-    scan = table.scan()
-    users.extend(scan['Items'])
-
-    while 'LastEvaluatedKey' in scan:
-        scan = table.scan(ExclusiveStartKey=scan['LastEvaluatedKey'])
-        users.extend(scan['Items'])
-
-    users_sorted = sorted(users, key=lambda x: x['email'])
-    return users_sorted
+def list_users_sorted_by_email(page_size=None):
+    # Streams from the EmailSortIndex instead of scanning and sorting in memory
+    return iter_users_by_email(table, page_size=page_size)
 
 sorted_users = list_users_sorted_by_email()
 print("Users sorted by email:")
 for user in sorted_users:
     print(user)
+
+# ----------------------------
+# 5. All records of one user, newest first
+# ----------------------------
+def list_user_records(user_id, limit=None):
+    # One parallel query per shard, merged by created_at
+    return query_user_records(table, user_id, newest_first=True, limit=limit)
+
+print(f"Records for user 1 ({USER_SHARD_COUNT} shard(s)):")
+for record in list_user_records('1'):
+    print(record)
@@ -0,0 +1,97 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tables import worker_table
+
+# ----------------------------
+# Parallel segmented scan
+# ----------------------------
+# Each worker scans one Segment of TotalSegments and hands pages to the
+# consumer through a bounded queue, so memory stays at roughly
+# max_buffered_pages pages no matter how large the table is.
+
+_SEGMENT_DONE = object()
+
+def _projection_args(projection):
+    if not projection:
+        return {}
+    names = {f"#p{i}": attr for i, attr in enumerate(projection)}
+    return {
+        'ProjectionExpression': ", ".join(names),
+        'ExpressionAttributeNames': names,
+    }
+
+def _scan_segment(table, segment, total_segments, scan_kwargs, pages, stop, stats):
+    started = time.perf_counter()
+    item_count = page_count = 0
+    try:
+        segment_table = worker_table(table)
+        kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+        while not stop.is_set():
+            page = segment_table.scan(**kwargs)
+            item_count += len(page['Items'])
+            page_count += 1
+            _put(pages, page['Items'], stop)
+            if 'LastEvaluatedKey' not in page:
+                break
+            kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+    except Exception as e:
+        _put(pages, e, stop)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats[segment] = {
+            'items': item_count,
+            'pages': page_count,
+            'seconds': round(elapsed, 3),
+            'items_per_second': round(item_count / elapsed, 1) if elapsed else 0.0,
+        }
+        _put(pages, _SEGMENT_DONE, stop)
+
+def _put(pages, value, stop):
+    # Block while the consumer is behind, but give up once it has gone away
+    while not stop.is_set():
+        try:
+            pages.put(value, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+def parallel_scan(table, total_segments=None, projection=None, page_size=None,
+                  max_buffered_pages=None, stats=None, **scan_kwargs):
+    """Yield every item of `table`, scanning `total_segments` segments at once.
+
+    `projection` is a list of attribute names, `page_size` maps to Limit and
+    extra keyword arguments (e.g. FilterExpression) go to every scan call.
+    Pass a dict as `stats` to receive per-segment item counts and throughput.
+    """
+    total_segments = total_segments or os.cpu_count() or 1
+    max_buffered_pages = max_buffered_pages or total_segments * 2
+    stats = {} if stats is None else stats
+
+    scan_kwargs.update(_projection_args(projection))
+    if page_size:
+        scan_kwargs['Limit'] = page_size
+
+    pages = queue.Queue(maxsize=max_buffered_pages)
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=total_segments)
+    for segment in range(total_segments):
+        executor.submit(_scan_segment, table, segment, total_segments,
+                        scan_kwargs, pages, stop, stats)
+
+    finished = 0
+    try:
+        while finished < total_segments:
+            page = pages.get()
+            if page is _SEGMENT_DONE:
+                finished += 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        # Also reached when the caller stops iterating early
+        stop.set()
+        executor.shutdown(wait=True)
@@ -0,0 +1,122 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from tables import worker_table
+
+# ----------------------------
+# Write sharding for the Users table
+# ----------------------------
+# Every record of a user lands in one partition (HASH user_id), so a busy
+# user is capped at a single partition's ~1000 WCU/s. With sharding on,
+# each record is written under "<user_id>#<shard>", the shard computed from
+# (user_id, created_at), and reads query every shard in parallel and merge
+# by created_at.
+#
+# USER_SHARD_COUNT is fixed for a table's lifetime: records written under a
+# different count are not found again. 1 (the default) writes plain keys.
+#
+# The shard only spreads a user's writes if created_at differs per write, so
+# created_at is a fixed-width nanosecond timestamp (created_at_now).
+
+USER_SHARD_COUNT = int(os.environ.get('USER_SHARD_COUNT', '1'))
+SHARD_SEPARATOR = '#'
+
+_local = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+def format_created_at(ns):
+    # 19 digits, so string order is time order; the first 10 digits are the
+    # epoch seconds, so older second-resolution values still sort correctly
+    return f"{ns:019d}"
+
+def created_at_now():
+    """Sort key for a new record; same-second writes get distinct values (and shards)."""
+    return format_created_at(time.time_ns())
+
+def shard_for(user_id, created_at, shard_count=None):
+    shard_count = shard_count or USER_SHARD_COUNT
+    # crc32 is stable across processes, unlike hash() on str
+    return zlib.crc32(f"{user_id}|{created_at}".encode()) % shard_count
+
+def shard_key(user_id, created_at, shard_count=None):
+    """Partition key value to write a record under."""
+    shard_count = shard_count or USER_SHARD_COUNT
+    if shard_count <= 1:
+        return user_id
+    return f"{user_id}{SHARD_SEPARATOR}{shard_for(user_id, created_at, shard_count)}"
+
+def shard_keys(user_id, shard_count=None):
+    shard_count = shard_count or USER_SHARD_COUNT
+    if shard_count <= 1:
+        return [user_id]
+    return [f"{user_id}{SHARD_SEPARATOR}{shard}" for shard in range(shard_count)]
+
+def unshard(item, shard_count=None):
+    """Restore the logical user_id on an item read back from the table."""
+    shard_count = shard_count or USER_SHARD_COUNT
+    if shard_count > 1 and 'user_id' in item:
+        item['user_id'] = item['user_id'].rsplit(SHARD_SEPARATOR, 1)[0]
+    return item
+
+def _thread_table(table):
+    # boto3 resources are not thread-safe; one Table per pool thread, reused
+    tables = getattr(_local, 'tables', None)
+    if tables is None:
+        tables = _local.tables = {}
+    if table.name not in tables:
+        tables[table.name] = worker_table(table)
+    return tables[table.name]
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.environ.get('USER_SHARD_READ_WORKERS', '16')))
+        return _executor
+
+def _query_shard(table, partition_key, newest_first, limit):
+    thread_table = _thread_table(table)
+    kwargs = {
+        'KeyConditionExpression': Key('user_id').eq(partition_key),
+        'ScanIndexForward': not newest_first,
+    }
+    if limit:
+        kwargs['Limit'] = limit
+    items = []
+    while True:
+        page = thread_table.query(**kwargs)
+        items.extend(page['Items'])
+        if 'LastEvaluatedKey' not in page or (limit and len(items) >= limit):
+            return items[:limit] if limit else items
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+def query_user_records(table, user_id, newest_first=True, limit=None, shard_count=None):
+    """Every record of `user_id` ordered by created_at, gathered from all shards.
+
+    Each shard is queried on its own thread; with `limit`, a shard returns at
+    most `limit` records, which is all the merge can use.
+    """
+    shard_count = shard_count or USER_SHARD_COUNT
+    keys = shard_keys(user_id, shard_count)
+    if len(keys) == 1:
+        streams = [_query_shard(table, keys[0], newest_first, limit)]
+    else:
+        executor = _get_executor()
+        futures = [executor.submit(_query_shard, table, key, newest_first, limit) for key in keys]
+        streams = [f.result() for f in futures]
+    merged = heapq.merge(*streams, key=lambda item: item['created_at'], reverse=newest_first)
+    if limit:
+        merged = itertools.islice(merged, limit)
+    return [unshard(item, shard_count) for item in merged]
+
+def get_user_record(table, user_id, created_at, shard_count=None):
+    # The shard is a function of the key, so point reads stay a single GetItem
+    key = {'user_id': shard_key(user_id, created_at, shard_count), 'created_at': created_at}
+    item = table.get_item(Key=key).get('Item')
+    return unshard(item, shard_count) if item else None
@@ -0,0 +1,11 @@
+import boto3
+
+def worker_table(table):
+    """A Table on its own session, for use from one worker thread.
+
+    boto3 resources are not thread-safe, so pool threads must not share
+    the caller's Table.
+    """
+    session = boto3.session.Session()
+    region = table.meta.client.meta.region_name
+    return session.resource('dynamodb', region_name=region).Table(table.name)
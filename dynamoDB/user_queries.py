@@ -0,0 +1,84 @@
+import base64
+import heapq
+import json
+from boto3.dynamodb.conditions import Key
+from sharding import USER_SHARD_COUNT, query_user_records, unshard
+
+# ----------------------------
+# Index-backed access patterns for the Users table
+# ----------------------------
+# lookup by email          -> EmailIndex (HASH email)
+# range by email prefix    -> EmailSortIndex (HASH email_bucket, RANGE email)
+# latest record per user   -> base table (HASH user_id, RANGE created_at),
+#                             one query per shard when write sharding is on
+# all users ordered by email -> k-way merge of every EmailSortIndex bucket
+
+EMAIL_INDEX = 'EmailIndex'
+EMAIL_SORT_INDEX = 'EmailSortIndex'
+
+# A GSI sort key only orders items within one partition, so emails are
+# spread over one partition per leading character
+EMAIL_BUCKETS = list("0123456789abcdefghijklmnopqrstuvwxyz") + ['#']
+
+def email_bucket(email):
+    first = email[:1].lower()
+    return first if first in EMAIL_BUCKETS else '#'
+
+def encode_token(last_key):
+    if not last_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_key).encode()).decode()
+
+def decode_token(token):
+    return json.loads(base64.urlsafe_b64decode(token)) if token else None
+
+def _unsharded(items):
+    # Index items carry the sharded user_id; skip the per-item work when unsharded
+    return [unshard(item) for item in items] if USER_SHARD_COUNT > 1 else items
+
+def _query_page(table, limit, token, **kwargs):
+    if limit:
+        kwargs['Limit'] = limit
+    if token:
+        kwargs['ExclusiveStartKey'] = decode_token(token)
+    page = table.query(**kwargs)
+    return _unsharded(page['Items']), encode_token(page.get('LastEvaluatedKey'))
+
+def _query_all(table, **kwargs):
+    while True:
+        page = table.query(**kwargs)
+        yield from _unsharded(page['Items'])
+        if 'LastEvaluatedKey' not in page:
+            return
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+def get_users_by_email(table, email, limit=None, token=None):
+    """Return (items, next_token) for every record with this exact email."""
+    return _query_page(table, limit, token, IndexName=EMAIL_INDEX,
+                       KeyConditionExpression=Key('email').eq(email))
+
+def get_users_by_email_prefix(table, prefix, limit=None, token=None):
+    """Return (items, next_token) for emails starting with `prefix`, in email order."""
+    if not prefix:
+        raise ValueError("prefix must not be empty")
+    return _query_page(table, limit, token, IndexName=EMAIL_SORT_INDEX,
+                       KeyConditionExpression=Key('email_bucket').eq(email_bucket(prefix))
+                       & Key('email').begins_with(prefix))
+
+def get_latest_user_record(table, user_id):
+    # newest created_at first, merged across shards
+    items = query_user_records(table, user_id, newest_first=True, limit=1)
+    return items[0] if items else None
+
+def iter_users_by_email(table, page_size=None):
+    """Yield every user in global email order, holding one page per bucket."""
+    streams = []
+    for bucket in EMAIL_BUCKETS:
+        kwargs = {
+            'IndexName': EMAIL_SORT_INDEX,
+            'KeyConditionExpression': Key('email_bucket').eq(bucket),
+        }
+        if page_size:
+            kwargs['Limit'] = page_size
+        streams.append(_query_all(table, **kwargs))
+    return heapq.merge(*streams, key=lambda item: item['email'])
@@ -1,45 +1,275 @@
 import os
-import json
+import random
+import time
+from collections import OrderedDict
 import boto3
+from botocore.exceptions import ClientError
+from http_response import conditional_response, request_body
+from metrics import instrument_handler, phase
+from serialization import dumps, from_item, loads, to_item
 
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(os.environ["TABLE_NAME"])
 
-def response(status_code, body=None):
+# Read through the low-level client and convert items straight to JSON-ready
+# values, skipping the resource layer's TypeDeserializer and Decimals
+RAW_CLIENT_READS = os.environ.get("RAW_CLIENT_READS", "false").lower() == "true"
+_raw_client = None
+
+def get_raw_client():
+    # The resource's meta.client has the (de)serializing hooks attached, so
+    # raw reads and pre-serialized batch writes need a client of their own
+    global _raw_client
+    if _raw_client is None:
+        _raw_client = boto3.client("dynamodb")
+    return _raw_client
+
+# DynamoDB per-call limits
+BATCH_WRITE_LIMIT = 25
+BATCH_GET_LIMIT = 100
+MAX_BATCH_RETRIES = 6
+
+# Optional read-through cache for GET /tasks/{id}, local to this container.
+# Other containers only see a write once the TTL runs out.
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "false").lower() == "true"
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "5"))
+CACHE_MAX_ITEMS = int(os.environ.get("CACHE_MAX_ITEMS", "1000"))
+
+_cache = OrderedDict()  # task id -> (expires_at, item), least recently used first
+cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+def cache_get(task_id):
+    entry = _cache.get(task_id)
+    if entry is None:
+        cache_stats["misses"] += 1
+        return None
+    if entry[0] < time.monotonic():
+        del _cache[task_id]
+        cache_stats["expirations"] += 1
+        cache_stats["misses"] += 1
+        return None
+    _cache.move_to_end(task_id)
+    cache_stats["hits"] += 1
+    return entry[1]
+
+def cache_put(task_id, item):
+    _cache[task_id] = (time.monotonic() + CACHE_TTL_SECONDS, item)
+    _cache.move_to_end(task_id)
+    while len(_cache) > CACHE_MAX_ITEMS:
+        _cache.popitem(last=False)
+        cache_stats["evictions"] += 1
+
+def cache_invalidate(task_id):
+    _cache.pop(task_id, None)
+
+def response(status_code, body=None, headers=None):
+    with phase("Encode"):
+        payload = dumps(body) if body is not None else ""
     return {
         "statusCode": status_code,
-        "body": json.dumps(body) if body is not None else "",
-        "headers": {"Content-Type": "application/json"}
+        "body": payload,
+        "headers": {"Content-Type": "application/json", **(headers or {})}
     }
 
 def create_task(body):
     if not body.get("id"):
         return response(400, {"error": "Task must have an 'id'"})
-    table.put_item(Item=body)
+    with phase("DynamoDB"):
+        table.put_item(Item=body)
+    cache_invalidate(body["id"])
     return response(201, body)
 
-def get_task(task_id):
+def get_task(task_id, consistent=False):
     if not task_id:
         return response(400, {"error": "Task ID missing"})
-    result = table.get_item(Key={"id": task_id})
+    # Strongly consistent reads always go to the table
+    if CACHE_ENABLED and not consistent:
+        item = cache_get(task_id)
+        if item is not None:
+            return response(200, item, {"X-Cache": "HIT"})
+    with phase("DynamoDB"):
+        if RAW_CLIENT_READS:
+            result = get_raw_client().get_item(TableName=table.name, Key={"id": {"S": task_id}},
+                                               ConsistentRead=consistent)
+            if "Item" in result:
+                result["Item"] = from_item(result["Item"])
+        else:
+            result = table.get_item(Key={"id": task_id}, ConsistentRead=consistent)
     item = result.get("Item")
     if not item:
         return response(404, {"error": "Task not found"})
+    if CACHE_ENABLED:
+        cache_put(task_id, item)
+        return response(200, item, {"X-Cache": "BYPASS" if consistent else "MISS"})
     return response(200, item)
 
 def update_task(task_id, body):
     if not task_id:
         return response(400, {"error": "Task ID missing"})
-    body["id"] = task_id  # ensure ID matches path
-    table.put_item(Item=body)
-    return response(200, body)
+    expected_version = body.pop("expected_version", None)
+    if expected_version is not None and type(expected_version) is not int:
+        return response(400, {"error": "expected_version must be an integer"})
+    # id is the key and version is maintained here, so neither is client-writable
+    fields = {k: v for k, v in body.items() if k not in ("id", "version")}
+    if not fields:
+        return response(400, {"error": "Nothing to update"})
+
+    # Placeholders for every name sidestep DynamoDB reserved words like "status"
+    names = {"#version": "version"}
+    values = {":one": 1}
+    assignments = []
+    for i, (name, value) in enumerate(fields.items()):
+        names[f"#f{i}"] = name
+        values[f":v{i}"] = value
+        assignments.append(f"#f{i} = :v{i}")
+
+    kwargs = {
+        "Key": {"id": task_id},
+        "UpdateExpression": f"SET {', '.join(assignments)} ADD #version :one",
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+        "ReturnValues": "UPDATED_NEW",
+    }
+    # update_item would otherwise upsert a stub item for an unknown id
+    names["#id"] = "id"
+    kwargs["ConditionExpression"] = "attribute_exists(#id)"
+    if expected_version is not None:
+        kwargs["ConditionExpression"] += " AND #version = :expected"
+        values[":expected"] = expected_version
+        # The failed item tells a missing task (404) from a stale version (409)
+        kwargs["ReturnValuesOnConditionCheckFailure"] = "ALL_OLD"
+
+    try:
+        with phase("DynamoDB"):
+            result = table.update_item(**kwargs)
+        cache_invalidate(task_id)
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            if expected_version is not None and "Item" in e.response:
+                return response(409, {"error": "Version mismatch"})
+            return response(404, {"error": "Task not found"})
+        raise
+    attributes = result.get("Attributes", {})
+    attributes["id"] = task_id
+    return response(200, attributes)
 
 def delete_task(task_id):
     if not task_id:
         return response(400, {"error": "Task ID missing"})
-    table.delete_item(Key={"id": task_id})
+    with phase("DynamoDB"):
+        table.delete_item(Key={"id": task_id})
+    cache_invalidate(task_id)
     return response(204)
 
+def chunks(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+def backoff(attempt):
+    # Full jitter: sleep a random time up to an exponentially growing cap
+    time.sleep(random.uniform(0, min(2.0, 0.05 * 2 ** attempt)))
+
+def request_id(request):
+    # Task id of a low-level PutRequest/DeleteRequest
+    if "PutRequest" in request:
+        return request["PutRequest"]["Item"]["id"]["S"]
+    return request["DeleteRequest"]["Key"]["id"]["S"]
+
+def batch_write_tasks(body):
+    results = []
+    index = {}  # task id -> position in results
+    requests = []
+    writes = [(item.get("id") if isinstance(item, dict) else None, 201, item)
+              for item in body.get("put") or []]
+    writes += [(task_id, 204, None) for task_id in body.get("delete") or []]
+    for task_id, status, item in writes:
+        # A single BatchWriteItem call rejects the whole chunk on duplicate keys
+        if not isinstance(task_id, str) or not task_id or task_id in index:
+            results.append({"id": task_id, "status": 400, "error": "Missing or duplicate id"})
+            continue
+        # Serialize every item before sending anything, so one bad value is
+        # a 400 for that item rather than a 500 after earlier chunks committed
+        try:
+            request = ({"PutRequest": {"Item": to_item(item)}} if item is not None
+                       else {"DeleteRequest": {"Key": {"id": {"S": task_id}}}})
+        except ValueError as e:
+            results.append({"id": task_id, "status": 400, "error": str(e)})
+            continue
+        index[task_id] = len(results)
+        cache_invalidate(task_id)
+        results.append({"id": task_id, "status": status})
+        requests.append(request)
+
+    client = get_raw_client()
+    for chunk in chunks(requests, BATCH_WRITE_LIMIT):
+        pending = {table.name: chunk}
+        try:
+            for attempt in range(MAX_BATCH_RETRIES + 1):
+                with phase("DynamoDB"):
+                    pending = client.batch_write_item(RequestItems=pending).get("UnprocessedItems")
+                if not pending:
+                    break
+                if attempt < MAX_BATCH_RETRIES:
+                    backoff(attempt)
+        except (ClientError, TypeError) as e:
+            # The call failed as a whole (e.g. an item over 400 KB); report it
+            # on every item still pending in this chunk and go on to the next
+            if isinstance(e, ClientError):
+                code = e.response["Error"]["Code"]
+                status = 400 if code == "ValidationException" else 502
+                error = e.response["Error"]["Message"]
+            else:
+                status, error = 400, str(e)
+            for request in pending[table.name]:
+                task_id = request_id(request)
+                results[index[task_id]] = {"id": task_id, "status": status, "error": error}
+            continue
+        for request in (pending or {}).get(table.name, []):
+            task_id = request_id(request)
+            results[index[task_id]] = {"id": task_id, "status": 503, "error": "Unprocessed after retries"}
+
+    return response(200, {"results": results})
+
+def batch_get_tasks(body):
+    ids = body.get("ids")
+    if not isinstance(ids, list) or not ids:
+        return response(400, {"error": "ids must be a non-empty list"})
+    if not all(isinstance(task_id, str) and task_id for task_id in ids):
+        return response(400, {"error": "Every id must be a non-empty string"})
+    ids = list(dict.fromkeys(ids))
+
+    if RAW_CLIENT_READS:
+        batch_get, convert = get_raw_client().batch_get_item, from_item
+        key = lambda task_id: {"id": {"S": task_id}}
+    else:
+        batch_get, convert = dynamodb.batch_get_item, lambda item: item
+        key = lambda task_id: {"id": task_id}
+
+    items, unprocessed = [], []
+    for chunk in chunks(ids, BATCH_GET_LIMIT):
+        pending = {table.name: {"Keys": [key(task_id) for task_id in chunk]}}
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            with phase("DynamoDB"):
+                result = batch_get(RequestItems=pending)
+                items.extend(convert(item) for item in result["Responses"].get(table.name, []))
+            pending = result.get("UnprocessedKeys")
+            if not pending:
+                break
+            if attempt < MAX_BATCH_RETRIES:
+                backoff(attempt)
+        unprocessed.extend(convert(k)["id"] for k in (pending or {}).get(table.name, {}).get("Keys", []))
+
+    found = {item["id"] for item in items}
+    missing = [task_id for task_id in ids if task_id not in found and task_id not in unprocessed]
+    return response(200, {"items": items, "missing": missing, "unprocessed": unprocessed})
+
+def cache_properties():
+    if not CACHE_ENABLED:
+        return {}
+    return {"CacheHits": cache_stats["hits"], "CacheMisses": cache_stats["misses"],
+            "CacheEvictions": cache_stats["evictions"], "CacheSize": len(_cache)}
+
+@instrument_handler("TaskManagerDynamoDB", properties=cache_properties)
 def lambda_handler(event, context):
     method = event.get("httpMethod")
     path = event.get("path", "")
@@ -47,15 +277,24 @@ def lambda_handler(event, context):
     task_id = path_params.get("id")
 
     try:
-        if method == "POST" and path.endswith("/tasks"):
-            body = json.loads(event.get("body") or "{}")
+        if method == "POST" and path.endswith("/tasks/batch-write"):
+            body = loads(request_body(event))
+            return batch_write_tasks(body)
+
+        elif method == "POST" and path.endswith("/tasks/batch-get"):
+            body = loads(request_body(event))
+            return batch_get_tasks(body)
+
+        elif method == "POST" and path.endswith("/tasks"):
+            body = loads(request_body(event))
             return create_task(body)
 
         elif method == "GET" and "/tasks/" in path:
-            return get_task(task_id)
+            query = event.get("queryStringParameters") or {}
+            return conditional_response(get_task(task_id, consistent=query.get("consistent") == "true"), event)
 
         elif method == "PUT" and "/tasks/" in path:
-            body = json.loads(event.get("body") or "{}")
+            body = loads(request_body(event))
             return update_task(task_id, body)
 
         elif method == "DELETE" and "/tasks/" in path:
@@ -1,8 +1,13 @@
+import argparse
+import base64
 import boto3
+import hashlib
+import io
 import json
 import os
 import time
 import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from botocore.exceptions import ClientError
 
 AWS_REGION = "us-east-1"
@@ -10,6 +15,26 @@ LAMBDA_NAME = "TasksFunction"
 API_NAME = "TasksAPI"
 TABLE_NAME = "Tasks"
 ROLE_NAME = "lambda-dynamodb-crud-role"
+LAMBDA_FILES = ["app.py", "serialization.py"]
+# Modules shared with the RDS Lambda; the one copy lives in lambda-shared/
+SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda-shared")
+SHARED_FILES = ["http_response.py", "metrics.py"]
+STAGE_NAME = "prod"
+
+# Lets compressed (base64) Lambda responses reach clients as bytes; request
+# bodies then arrive base64-encoded as well
+BINARY_MEDIA_TYPES = ["*/*"]
+
+# Desired API shape: resource path -> HTTP methods proxied to the Lambda
+ROUTES = {
+    "/tasks": ["POST"],
+    "/tasks/{id}": ["GET", "PUT", "DELETE"],
+    "/tasks/batch-write": ["POST"],
+    "/tasks/batch-get": ["POST"],
+}
+
+# Fixed metadata so identical sources always produce byte-identical zips
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
 
 iam = boto3.client("iam", region_name=AWS_REGION)
 dynamodb = boto3.client("dynamodb", region_name=AWS_REGION)
@@ -19,6 +44,54 @@ sts = boto3.client("sts")
 
 ACCOUNT_ID = sts.get_caller_identity()["Account"]
 
+def retry_with_backoff(func, is_retryable, attempts=8, base_delay=0.5, max_delay=8.0):
+    for attempt in range(attempts):
+        try:
+            return func()
+        except ClientError as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            time.sleep(min(max_delay, base_delay * 2 ** attempt))
+
+def role_not_assumable_yet(error):
+    # A freshly created role takes a few seconds to become visible to Lambda
+    return (error.response["Error"]["Code"] == "InvalidParameterValueException"
+            and "cannot be assumed" in error.response["Error"]["Message"])
+
+def run_steps(steps, max_workers=4):
+    """Run {name: (func, [dependency names])} concurrently in dependency order.
+
+    Each func is called with its dependencies' results as positional arguments.
+    """
+    started = time.perf_counter()
+    results, timings = {}, {}
+    pending = dict(steps)
+    running = {}
+
+    def timed(func, args):
+        begin = time.perf_counter()
+        result = func(*args)
+        return result, (begin - started, time.perf_counter() - begin)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, (func, deps) in list(pending.items()):
+                if all(dep in results for dep in deps):
+                    del pending[name]
+                    running[pool.submit(timed, func, [results[dep] for dep in deps])] = name
+            if not running:
+                raise RuntimeError(f"Unsatisfiable step dependencies: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], timings[name] = future.result()
+
+    print("=== Step timings (start offset / duration) ===")
+    for name, (offset, duration) in sorted(timings.items(), key=lambda t: t[1][0]):
+        print(f"{name:<12} +{offset:6.2f}s  {duration:6.2f}s")
+    print(f"{'total':<12}          {time.perf_counter() - started:6.2f}s")
+    return results
+
 def ensure_dynamodb_table():
     try:
         dynamodb.describe_table(TableName=TABLE_NAME)
@@ -64,8 +137,7 @@ def create_iam_role():
             RoleName=ROLE_NAME,
             PolicyArn="arn:aws:iam::aws:policy/AmazonDynamoDBFullAccess",
         )
-        print("Waiting for role to propagate...")
-        time.sleep(10)
+        iam.get_waiter("role_exists").wait(RoleName=ROLE_NAME)
         return role_arn
     except ClientError as e:
         if e.response["Error"]["Code"] == "EntityAlreadyExists":
@@ -73,82 +145,163 @@ def create_iam_role():
         else:
             raise
 
+def build_zip():
+    """The deployment zip as bytes, built in memory."""
+    sources = {name: name for name in LAMBDA_FILES}
+    sources.update((name, os.path.join(SHARED_DIR, name)) for name in SHARED_FILES)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        for name in sorted(sources):
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(sources[name], "rb") as f:
+                z.writestr(info, f.read())
+    return buffer.getvalue()
+
 def package_lambda():
     print("Packaging Lambda function...")
-    with zipfile.ZipFile("lambda-crud.zip", "w") as z:
-        z.write("app.py")
+    with open("lambda-crud.zip", "wb") as f:
+        f.write(build_zip())
     return os.path.abspath("lambda-crud.zip")
 
+def code_sha256(code_bytes):
+    # Same encoding Lambda uses for CodeSha256
+    return base64.b64encode(hashlib.sha256(code_bytes).digest()).decode()
+
 def create_or_update_lambda(role_arn, zip_path):
     with open(zip_path, "rb") as f:
         code_bytes = f.read()
 
     try:
+        config = lambda_client.get_function_configuration(FunctionName=LAMBDA_NAME)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ResourceNotFoundException":
+            raise
         print("Creating Lambda function...")
-        lambda_client.create_function(
+        # Retried instead of sleeping up front for IAM propagation
+        retry_with_backoff(lambda: lambda_client.create_function(
             FunctionName=LAMBDA_NAME,
             Runtime="python3.12",
             Role=role_arn,
             Handler="app.lambda_handler",
             Code={"ZipFile": code_bytes},
             Environment={"Variables": {"TABLE_NAME": TABLE_NAME}},
-        )
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ResourceConflictException":
-            print("Updating existing Lambda function...")
-            lambda_client.update_function_code(
-                FunctionName=LAMBDA_NAME, ZipFile=code_bytes
-            )
-        else:
-            raise
+        ), role_not_assumable_yet)
+        lambda_client.get_waiter("function_active_v2").wait(FunctionName=LAMBDA_NAME)
+        return True
+
+    if config["CodeSha256"] == code_sha256(code_bytes):
+        print("Lambda code unchanged, skipping upload.")
+        return False
+    print("Updating existing Lambda function...")
+    lambda_client.update_function_code(
+        FunctionName=LAMBDA_NAME, ZipFile=code_bytes
+    )
+    lambda_client.get_waiter("function_updated_v2").wait(FunctionName=LAMBDA_NAME)
+    return True
+
+def find_api():
+    for page in apigateway.get_paginator("get_rest_apis").paginate():
+        for item in page["items"]:
+            if item["name"] == API_NAME:
+                return item["id"]
+    return None
 
 def create_or_get_api():
-    apis = apigateway.get_rest_apis()
-    for item in apis.get("items", []):
-        if item["name"] == API_NAME:
-            return item["id"]
+    api_id = find_api()
+    if api_id:
+        return api_id
     print("Creating API Gateway REST API...")
-    api = apigateway.create_rest_api(name=API_NAME)
+    api = apigateway.create_rest_api(name=API_NAME, binaryMediaTypes=BINARY_MEDIA_TYPES)
     return api["id"]
 
-def get_root_resource_id(api_id):
-    resources = apigateway.get_resources(restApiId=api_id)
-    return next(item["id"] for item in resources["items"] if item["path"] == "/")
-
-def create_resource(api_id, parent_id, path_part):
-    resources = apigateway.get_resources(restApiId=api_id)
-    for item in resources["items"]:
-        if item["path"] == f"/{path_part}" or (path_part == "{id}" and item["path"] == "/tasks/{id}"):
-            return item["id"]
-    res = apigateway.create_resource(
-        restApiId=api_id, parentId=parent_id, pathPart=path_part
+def missing_binary_media_types(api_id):
+    current = apigateway.get_rest_api(restApiId=api_id).get("binaryMediaTypes", [])
+    return [t for t in BINARY_MEDIA_TYPES if t not in current]
+
+def ensure_binary_media_types(api_id):
+    # Compressed responses come back base64-encoded and are only decoded
+    # to bytes for media types the API lists as binary
+    missing = missing_binary_media_types(api_id)
+    if missing:
+        print(f"Adding binary media types: {', '.join(missing)}")
+        apigateway.update_rest_api(restApiId=api_id, patchOperations=[
+            # "/" inside a patch path is escaped as "~1"
+            {"op": "add", "path": f"/binaryMediaTypes/{t.replace('/', '~1')}"} for t in missing
+        ])
+    return bool(missing)
+
+def fetch_resource_index(api_id):
+    # One paginated listing with methods embedded replaces per-resource and per-method lookups
+    index = {}
+    paginator = apigateway.get_paginator("get_resources")
+    for page in paginator.paginate(restApiId=api_id, embed=["methods"]):
+        for item in page["items"]:
+            index[item["path"]] = item
+    return index
+
+def plan_routes(index):
+    """Return the ordered list of changes needed to reach ROUTES."""
+    changes = []
+    planned = set()
+    for path, methods in ROUTES.items():
+        parts = path.strip("/").split("/")
+        # Parents first so every created resource already has a parent id
+        for depth in range(1, len(parts) + 1):
+            sub_path = "/" + "/".join(parts[:depth])
+            if sub_path not in index and sub_path not in planned:
+                planned.add(sub_path)
+                changes.append(("resource", sub_path, None))
+        existing = index.get(path, {}).get("resourceMethods", {})
+        for method in methods:
+            if method not in existing:
+                changes.append(("method", path, method))
+            elif "methodIntegration" not in existing[method]:
+                changes.append(("integration", path, method))
+    return changes
+
+def print_plan(changes):
+    if not changes:
+        print("API routes: no changes.")
+    for kind, path, method in changes:
+        print(f"  + {kind:<11} {method or '':<6} {path}")
+
+def put_integration(api_id, resource_id, method):
+    apigateway.put_integration(
+        restApiId=api_id,
+        resourceId=resource_id,
+        httpMethod=method,
+        type="AWS_PROXY",
+        integrationHttpMethod="POST",
+        uri=f"arn:aws:apigateway:{AWS_REGION}:lambda:path/2015-03-31/functions/arn:aws:lambda:{AWS_REGION}:{ACCOUNT_ID}:function:{LAMBDA_NAME}/invocations",
     )
-    return res["id"]
 
-def create_method(api_id, resource_id, method):
-    try:
-        apigateway.get_method(restApiId=api_id, resourceId=resource_id, httpMethod=method)
-    except ClientError:
-        apigateway.put_method(
-            restApiId=api_id,
-            resourceId=resource_id,
-            httpMethod=method,
-            authorizationType="NONE",
-        )
-        apigateway.put_integration(
-            restApiId=api_id,
-            resourceId=resource_id,
-            httpMethod=method,
-            type="AWS_PROXY",
-            integrationHttpMethod="POST",
-            uri=f"arn:aws:apigateway:{AWS_REGION}:lambda:path/2015-03-31/functions/arn:aws:lambda:{AWS_REGION}:{ACCOUNT_ID}:function:{LAMBDA_NAME}/invocations",
-        )
+def apply_routes(api_id, index, changes):
+    for kind, path, method in changes:
+        if kind == "resource":
+            parent_path, path_part = path.rsplit("/", 1)
+            res = apigateway.create_resource(
+                restApiId=api_id, parentId=index[parent_path or "/"]["id"], pathPart=path_part
+            )
+            index[path] = res
+            continue
+        resource_id = index[path]["id"]
+        if kind == "method":
+            apigateway.put_method(
+                restApiId=api_id,
+                resourceId=resource_id,
+                httpMethod=method,
+                authorizationType="NONE",
+            )
+        put_integration(api_id, resource_id, method)
 
 def add_lambda_permission(api_id):
     try:
         lambda_client.add_permission(
             FunctionName=LAMBDA_NAME,
-            StatementId=f"apigateway-{int(time.time())}",
+            # Stable id: re-runs hit ResourceConflictException instead of piling up statements
+            StatementId=f"apigateway-{api_id}",
             Action="lambda:InvokeFunction",
             Principal="apigateway.amazonaws.com",
             SourceArn=f"arn:aws:execute-api:{AWS_REGION}:{ACCOUNT_ID}:{api_id}/*/*/*",
@@ -157,23 +310,72 @@ def add_lambda_permission(api_id):
         if e.response["Error"]["Code"] != "ResourceConflictException":
             raise
 
+def stage_exists(api_id):
+    stages = apigateway.get_stages(restApiId=api_id)
+    return any(item["stageName"] == STAGE_NAME for item in stages.get("item", []))
+
 def deploy_api(api_id):
-    apigateway.create_deployment(restApiId=api_id, stageName="prod")
-    return f"https://{api_id}.execute-api.{AWS_REGION}.amazonaws.com/prod"
+    apigateway.create_deployment(restApiId=api_id, stageName=STAGE_NAME)
+
+def api_url(api_id):
+    return f"https://{api_id}.execute-api.{AWS_REGION}.amazonaws.com/{STAGE_NAME}"
+
+def ensure_routes(api_id):
+    index = fetch_resource_index(api_id)
+    changes = plan_routes(index)
+    print_plan(changes)
+    apply_routes(api_id, index, changes)
+    settings_changed = ensure_binary_media_types(api_id)
+    return bool(changes) or settings_changed
+
+def deploy_if_changed(api_id, api_changed):
+    # Proxy integrations call the function directly, so code-only changes need no new deployment
+    if api_changed or not stage_exists(api_id):
+        deploy_api(api_id)
+    else:
+        print("API unchanged, skipping deployment.")
+
+def plan():
+    # Read-only: the zip is hashed in memory and nothing is written or changed
+    local_sha = code_sha256(build_zip())
+    try:
+        remote_sha = lambda_client.get_function_configuration(FunctionName=LAMBDA_NAME)["CodeSha256"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ResourceNotFoundException":
+            raise
+        remote_sha = None
+    print(f"Lambda code: {'unchanged' if local_sha == remote_sha else 'would upload'}")
+
+    api_id = find_api()
+    if api_id is None:
+        print(f"API '{API_NAME}': would create")
+        # A new REST API starts with only the root resource
+        print_plan(plan_routes({"/": {"id": None}}))
+    else:
+        print_plan(plan_routes(fetch_resource_index(api_id)))
+        missing = missing_binary_media_types(api_id)
+        if missing:
+            print(f"  + binary media types: {', '.join(missing)}")
+        else:
+            print("Binary media types: no changes.")
 
 if __name__ == "__main__":
-    ensure_dynamodb_table()
-    role_arn = create_iam_role()
-    zip_path = package_lambda()
-    create_or_update_lambda(role_arn, zip_path)
-    api_id = create_or_get_api()
-    root_id = get_root_resource_id(api_id)
-    tasks_id = create_resource(api_id, root_id, "tasks")
-    task_id_res = create_resource(api_id, tasks_id, "{id}")
-    create_method(api_id, tasks_id, "POST")
-    create_method(api_id, task_id_res, "GET")
-    create_method(api_id, task_id_res, "PUT")
-    create_method(api_id, task_id_res, "DELETE")
-    add_lambda_permission(api_id)
-    api_url = deploy_api(api_id)
-    print(f"=== Deployment Complete ===\nAPI URL: {api_url}")
+    parser = argparse.ArgumentParser(description="Deploy the DynamoDB task API")
+    parser.add_argument("--plan", action="store_true",
+                        help="print the changes a deploy would make and exit")
+    if parser.parse_args().plan:
+        plan()
+        raise SystemExit(0)
+
+    results = run_steps({
+        "table": (ensure_dynamodb_table, []),
+        "role": (create_iam_role, []),
+        "package": (package_lambda, []),
+        "api": (create_or_get_api, []),
+        "lambda": (create_or_update_lambda, ["role", "package"]),
+        "routes": (ensure_routes, ["api"]),
+        "permission": (lambda api_id, _: add_lambda_permission(api_id), ["api", "lambda"]),
+        "deploy": (lambda api_id, api_changed, *_: deploy_if_changed(api_id, api_changed),
+                   ["api", "routes", "permission", "table"]),
+    })
+    print(f"=== Deployment Complete ===\nAPI URL: {api_url(results['api'])}")
@@ -0,0 +1,143 @@
+import base64
+import json
+from decimal import Decimal
+from boto3.dynamodb.types import Binary, TypeSerializer
+
+# orjson is several times faster on large item lists; it is optional so the
+# function still works when only the standard library is packaged.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def json_default(value):
+    # boto3 returns every DynamoDB number as Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    # String, number and binary sets come back as Python sets
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=lambda v: v.value if isinstance(v, Binary) else v)
+    # B attributes: boto3 Binary from the resource, bytes from the client
+    if isinstance(value, Binary):
+        return base64.b64encode(value.value).decode()
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _has_float(obj):
+    if isinstance(obj, float):
+        return True
+    if isinstance(obj, dict):
+        return any(_has_float(v) for v in obj.values())
+    if isinstance(obj, list):
+        return any(_has_float(v) for v in obj)
+    return False
+
+if orjson is not None:
+    def dumps(obj):
+        try:
+            return orjson.dumps(obj, default=json_default).decode()
+        except TypeError:
+            # orjson stops at 64-bit integers; DynamoDB numbers go to 38 digits
+            return json.dumps(obj, default=json_default)
+
+    def loads(data):
+        obj = orjson.loads(data)
+        # boto3 rejects floats, and orjson has no parse_float hook (it also
+        # turns integers past 64 bits into floats), so re-parse exactly
+        if _has_float(obj):
+            return json.loads(data, parse_float=Decimal)
+        return obj
+else:
+    def dumps(obj):
+        return json.dumps(obj, default=json_default)
+
+    def loads(data):
+        return json.loads(data, parse_float=Decimal)
+
+# ----------------------------
+# Raw low-level client reads
+# ----------------------------
+
+def _number(text):
+    if "." in text or "e" in text or "E" in text:
+        return float(text)
+    return int(text)
+
+def from_attribute(value):
+    """Convert one low-level AttributeValue straight to a JSON-ready value.
+
+    Skips TypeDeserializer and the Decimal round trip the resource layer
+    does, which is most of the per-item cost on large reads.
+    """
+    (kind, inner), = value.items()
+    if kind == "S":
+        return inner
+    if kind == "N":
+        return _number(inner)
+    if kind == "BOOL":
+        return inner
+    if kind == "NULL":
+        return None
+    if kind == "M":
+        return {k: from_attribute(v) for k, v in inner.items()}
+    if kind == "L":
+        return [from_attribute(v) for v in inner]
+    if kind == "SS":
+        return sorted(inner)
+    if kind == "NS":
+        return sorted(_number(n) for n in inner)
+    if kind == "B":
+        return base64.b64encode(inner).decode()
+    if kind == "BS":
+        return sorted(base64.b64encode(b).decode() for b in inner)
+    raise TypeError(f"Unknown DynamoDB type {kind}")
+
+def from_item(item):
+    return {k: from_attribute(v) for k, v in item.items()}
+
+# ----------------------------
+# Writes
+# ----------------------------
+
+_serializer = TypeSerializer()
+
+MAX_ITEM_BYTES = 400 * 1024
+
+def attribute_size(value):
+    """Stored size of one AttributeValue in bytes, per DynamoDB's sizing rules."""
+    (kind, inner), = value.items()
+    if kind == "S":
+        return len(inner.encode())
+    if kind == "N":
+        # Roughly one byte per two significant digits, plus one
+        return len(inner.lstrip("-").replace(".", "")) // 2 + 2
+    if kind == "B":
+        return len(inner)
+    if kind in ("BOOL", "NULL"):
+        return 1
+    if kind in ("SS", "NS", "BS"):
+        if not inner:
+            raise ValueError("Empty sets are not allowed")
+        key = kind[0]
+        return sum(attribute_size({key: member}) for member in inner)
+    if kind == "L":
+        return 3 + sum(1 + attribute_size(v) for v in inner)
+    if kind == "M":
+        return 3 + sum(1 + len(k.encode()) + attribute_size(v) for k, v in inner.items())
+    raise ValueError(f"Unknown DynamoDB type {kind}")
+
+def to_item(item):
+    """Serialize a whole item to low-level AttributeValues, or raise ValueError.
+
+    Done per item before a batch is sent, so a value DynamoDB cannot store
+    (a float, NaN, an empty set, over-precise numbers, over 400 KB) fails
+    that item alone instead of its whole BatchWriteItem call.
+    """
+    try:
+        serialized = {k: _serializer.serialize(v) for k, v in item.items()}
+    except (TypeError, ValueError, ArithmeticError) as e:
+        raise ValueError(f"Unsupported value: {e}") from e
+    if sum(len(k.encode()) + attribute_size(v) for k, v in serialized.items()) > MAX_ITEM_BYTES:
+        raise ValueError("Item exceeds DynamoDB's 400 KB limit")
+    return serialized
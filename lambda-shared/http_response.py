@@ -0,0 +1,90 @@
+# Shared by the RDS and DynamoDB task Lambdas. This is the only copy: deploy.py,
+# the CDK stack and build_artifact.py copy it into each package at build time.
+import base64
+import gzip
+import hashlib
+import os
+from metrics import phase
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies below this go out uncompressed: gzip framing plus base64 would
+# make small responses bigger, not smaller
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+def request_headers(event):
+    # API Gateway passes headers with the client's casing
+    return {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+
+def request_body(event, default="{}"):
+    # With binary media types enabled, API Gateway base64-encodes request bodies too
+    body = event.get("body")
+    if not body:
+        return default
+    if event.get("isBase64Encoded"):
+        return base64.b64decode(body).decode()
+    return body
+
+def choose_encoding(accept_encoding):
+    """Return "br", "gzip" or None for an Accept-Encoding header, honouring q=0."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    for name in ("br", "gzip"):
+        if name == "br" and brotli is None:
+            continue
+        if weights.get(name, weights.get("*", 0.0)) > 0:
+            return name
+    return None
+
+def etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ tags match too
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def conditional_response(response, event):
+    """Tag a 200 response with a strong ETag, answer If-None-Match with 304,
+    and compress the body when the client accepts it and it is big enough."""
+    if response.get("statusCode") != 200:
+        return response
+    request = request_headers(event)
+    body = response["body"].encode()
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = choose_encoding(request.get("accept-encoding", ""))
+
+    # A strong ETag names one exact representation, so the encoding is part of it
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+    headers = dict(response.get("headers") or {}, ETag=etag, Vary="Accept-Encoding")
+
+    if etag_matches(request.get("if-none-match", ""), etag):
+        headers.pop("Content-Type", None)
+        return {"statusCode": 304, "headers": headers, "body": ""}
+    if encoding is None:
+        return dict(response, headers=headers)
+
+    with phase("Compress"):
+        data = compress(body, encoding)
+    headers["Content-Encoding"] = encoding
+    return dict(response, headers=headers, body=base64.b64encode(data).decode(), isBase64Encoded=True)
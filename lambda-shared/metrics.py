@@ -0,0 +1,110 @@
+# Shared by the RDS and DynamoDB task Lambdas. This is the only copy: deploy.py,
+# the CDK stack and build_artifact.py copy it into each package at build time.
+import functools
+import json
+import os
+import time
+
+# Per-phase timings written as one CloudWatch Embedded Metric Format line per
+# invocation; CloudWatch Logs turns the line into metrics without API calls.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+NAMESPACE = os.environ.get("METRICS_NAMESPACE", "TaskManager")
+
+_cold_start = True
+_phases = {}
+
+class _Phase:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.started) * 1000
+        _phases[self.name] = _phases.get(self.name, 0.0) + elapsed
+        return False
+
+class _NoopPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopPhase()
+
+def phase(name):
+    """Context manager adding the block's wall time to phase `name` for this invocation."""
+    return _Phase(name) if METRICS_ENABLED else _NOOP
+
+def timed(name):
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def emit(service, total_ms, properties):
+    global _cold_start
+    metrics = [{"Name": "TotalMs", "Unit": "Milliseconds"},
+               {"Name": "ColdStart", "Unit": "Count"}]
+    record = {
+        "Service": service,
+        "TotalMs": round(total_ms, 3),
+        "ColdStart": 1 if _cold_start else 0,
+    }
+    for name, value in _phases.items():
+        metrics.append({"Name": f"{name}Ms", "Unit": "Milliseconds"})
+        record[f"{name}Ms"] = round(value, 3)
+    record.update(properties)
+    record["_aws"] = {
+        "Timestamp": int(time.time() * 1000),
+        "CloudWatchMetrics": [{
+            "Namespace": NAMESPACE,
+            "Dimensions": [["Service"]],
+            "Metrics": metrics,
+        }],
+    }
+    print(json.dumps(record, default=str))
+    _cold_start = False
+
+def instrument_handler(service, properties=None):
+    """Wrap a Lambda handler so each invocation emits one EMF line.
+
+    `properties` is an optional callable returning extra fields to log
+    alongside the metrics (searchable in Logs Insights, not metrics).
+    """
+    def decorator(handler):
+        if not METRICS_ENABLED:
+            return handler
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            _phases.clear()
+            started = time.perf_counter()
+            status = None
+            try:
+                result = handler(event, context)
+                status = result.get("statusCode") if isinstance(result, dict) else None
+                return result
+            finally:
+                extra = {
+                    "Route": f"{event.get('httpMethod')} {event.get('resource') or event.get('path')}",
+                    "StatusCode": status,
+                }
+                if properties:
+                    extra.update(properties())
+                emit(service, (time.perf_counter() - started) * 1000, extra)
+        return wrapper
+    return decorator
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the handler hot paths, with all AWS and Postgres I/O stubbed.
+
+Usage:
+    python benchmarks.py run [--filter rds] [--full]
+    python benchmarks.py save            # record baselines/benchmarks.json
+    python benchmarks.py compare         # exit 1 if a case regressed past the threshold
+
+compare gates on each case's best time, the least noisy statistic for CPU-bound
+microbenchmarks, and re-measures flagged cases after the suite before calling
+them regressions.
+save runs the suite several times and stores the median best plus the rounds'
+relative median absolute deviation ("noise"). The threshold is the gate;
+--noise-aware widens it by twice a case's noise, at most doubling it.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(PERF_DIR)
+BASELINE_PATH = os.path.join(PERF_DIR, "baselines", "benchmarks.json")
+DEFAULT_THRESHOLD = 0.25
+# Extra measurements of a flagged case; it fails only if every one is over
+CONFIRM_RUNS = 4
+SAVE_ROUNDS = 5
+
+# The handlers build clients and read config at import time; keep that offline
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("TABLE_NAME", "Tasks")
+os.environ.setdefault("DB_SECRET", "bench")
+
+for subdir in ("lambda-shared", "CDK-lambda-RDS-CRUD/lambda_src", "lambda-dynamoDB-CRUD", "dynamoDB"):
+    sys.path.insert(0, os.path.join(REPO_ROOT, subdir))
+
+BENCHMARKS = {}
+
+def benchmark(name, full_only=False):
+    def register(setup):
+        BENCHMARKS[name] = (setup, full_only)
+        return setup
+    return register
+
+# ----------------------------
+# Synthetic data and I/O stubs
+# ----------------------------
+
+def task_rows(n):
+    return [(i, f"task number {i} with a moderately long description", "pending") for i in range(1, n + 1)]
+
+def dynamo_items(n):
+    return [{"id": f"task-{i}", "title": f"task number {i}", "status": "pending",
+             "priority": Decimal(i % 5), "estimate": Decimal("1.5"), "version": Decimal(3)}
+            for i in range(n)]
+
+def user_items(n):
+    rng = random.Random(42)
+    return [{"user_id": str(rng.randrange(n)), "created_at": str(1700000000 + i), "name": f"user {i}",
+             "email": f"{rng.getrandbits(40):010x}@example.com"} for i in range(n)]
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, args=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    closed = 0
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def get_transaction_status(self):
+        return 0  # TRANSACTION_STATUS_IDLE
+
+class FakeScanTable:
+    """Serves pre-built pages per segment, like table.scan with Segment/TotalSegments."""
+    name = "Users"
+
+    def __init__(self, items, page_size=1000):
+        self.items = items
+        self.page_size = page_size
+
+    def scan(self, Segment=0, TotalSegments=1, ExclusiveStartKey=None, **kwargs):
+        mine = self.items[Segment::TotalSegments]
+        start = ExclusiveStartKey or 0
+        page = {"Items": mine[start:start + self.page_size]}
+        if start + self.page_size < len(mine):
+            page["LastEvaluatedKey"] = start + self.page_size
+        return page
+
+class FakeQueryTable:
+    """Serves EmailSortIndex queries from items pre-sorted per bucket."""
+
+    def __init__(self, items, bucket_of, page_size=1000):
+        self.buckets = {}
+        for item in sorted(items, key=lambda x: x["email"]):
+            self.buckets.setdefault(bucket_of(item["email"]), []).append(item)
+        self.page_size = page_size
+
+    def query(self, KeyConditionExpression, ExclusiveStartKey=None, **kwargs):
+        bucket = KeyConditionExpression.get_expression()["values"][1]
+        rows = self.buckets.get(bucket, [])
+        start = ExclusiveStartKey or 0
+        page = {"Items": rows[start:start + self.page_size]}
+        if start + self.page_size < len(rows):
+            page["LastEvaluatedKey"] = start + self.page_size
+        return page
+
+# ----------------------------
+# RDS handler
+# ----------------------------
+
+def rds_handler(rows):
+    import handler
+    handler._conn = FakeConnection(rows)
+    handler._schema_ready = True
+    handler.CONN_PING_AFTER = float("inf")
+    return handler
+
+def rds_dispatch(event, rows):
+    handler = rds_handler(rows)
+
+    def run():
+        # lambda_handler logs a line per call; keep it out of the timings output
+        with contextlib.redirect_stdout(io.StringIO()):
+            handler.lambda_handler(event, None)
+    return run
+
+@benchmark("rds.dispatch.get_page_50")
+def _():
+    return rds_dispatch({"httpMethod": "GET", "path": "/tasks", "queryStringParameters": {"limit": "50"}},
+                        task_rows(51))
+
+@benchmark("rds.dispatch.post")
+def _():
+    return rds_dispatch({"httpMethod": "POST", "path": "/tasks",
+                         "body": json.dumps({"description": "write tests"})}, [(1,)])
+
+@benchmark("rds.dispatch.put")
+def _():
+    return rds_dispatch({"httpMethod": "PUT", "path": "/tasks/1", "pathParameters": {"id": "1"},
+                         "body": json.dumps({"status": "done"})}, [])
+
+@benchmark("rds.rows_to_json.500")
+def _():
+    handler = rds_handler([])
+    cursor = FakeCursor(task_rows(501))
+    return lambda: handler.list_tasks(cursor, {"limit": "500"})
+
+# ----------------------------
+# DynamoDB handler
+# ----------------------------
+
+def dynamo_response(n):
+    import app
+    items = dynamo_items(n)
+    return lambda: app.response(200, {"items": items})
+
+@benchmark("dynamodb.response.1")
+def _():
+    return dynamo_response(1)
+
+@benchmark("dynamodb.response.100")
+def _():
+    return dynamo_response(100)
+
+@benchmark("dynamodb.response.1000")
+def _():
+    return dynamo_response(1000)
+
+# Encoder and read-path comparisons behind response(): stdlib json vs the
+# serialization module, and the resource layer's TypeDeserializer vs raw reads
+
+def dynamo_encode(n, fast):
+    import serialization
+    items = {"items": dynamo_items(n)}
+    if fast:
+        return lambda: serialization.dumps(items)
+    return lambda: json.dumps(items, default=serialization.json_default)
+
+def dynamo_deserialize(n, raw):
+    import serialization
+    from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+    serializer = TypeSerializer()
+    low_level = [{k: serializer.serialize(v) for k, v in item.items()} for item in dynamo_items(n)]
+    if raw:
+        return lambda: [serialization.from_item(item) for item in low_level]
+    deserializer = TypeDeserializer()
+    return lambda: [{k: deserializer.deserialize(v) for k, v in item.items()} for item in low_level]
+
+@benchmark("dynamodb.encode.stdlib.100")
+def _():
+    return dynamo_encode(100, fast=False)
+
+@benchmark("dynamodb.encode.fast.100")
+def _():
+    return dynamo_encode(100, fast=True)
+
+@benchmark("dynamodb.encode.stdlib.1000")
+def _():
+    return dynamo_encode(1000, fast=False)
+
+@benchmark("dynamodb.encode.fast.1000")
+def _():
+    return dynamo_encode(1000, fast=True)
+
+@benchmark("dynamodb.deserialize.resource.1000")
+def _():
+    return dynamo_deserialize(1000, raw=False)
+
+@benchmark("dynamodb.deserialize.raw.1000")
+def _():
+    return dynamo_deserialize(1000, raw=True)
+
+# ----------------------------
+# dynamoDB.py listing paths
+# ----------------------------
+
+def scan_and_sort(n):
+    import parallel_scan
+    parallel_scan._worker_table = lambda table: table
+    table = FakeScanTable(user_items(n))
+    return lambda: sorted(parallel_scan.parallel_scan(table, total_segments=4), key=lambda x: x["email"])
+
+def gsi_merge(n):
+    import user_queries
+    table = FakeQueryTable(user_items(n), user_queries.email_bucket)
+    return lambda: sum(1 for _ in user_queries.iter_users_by_email(table))
+
+@benchmark("users.scan_sort.1k")
+def _():
+    return scan_and_sort(1_000)
+
+@benchmark("users.scan_sort.100k")
+def _():
+    return scan_and_sort(100_000)
+
+@benchmark("users.scan_sort.1m", full_only=True)
+def _():
+    return scan_and_sort(1_000_000)
+
+@benchmark("users.gsi_merge.1k")
+def _():
+    return gsi_merge(1_000)
+
+@benchmark("users.gsi_merge.100k")
+def _():
+    return gsi_merge(100_000)
+
+@benchmark("users.gsi_merge.1m", full_only=True)
+def _():
+    return gsi_merge(1_000_000)
+
+# ----------------------------
+# Runner
+# ----------------------------
+
+def measure(func, min_time=0.1, repeats=15):
+    """Median and best seconds per call, calibrating the loop count to ~min_time."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - started) / loops)
+    return statistics.median(samples), min(samples)
+
+def run_case(name):
+    median, best = measure(BENCHMARKS[name][0]())
+    return {"median_us": round(median * 1e6, 2), "best_us": round(best * 1e6, 2)}
+
+def run_all(name_filter=None, full=False):
+    results = {}
+    for name, (setup, full_only) in BENCHMARKS.items():
+        if (name_filter and name_filter not in name) or (full_only and not full):
+            continue
+        results[name] = run_case(name)
+        print(f"{name:<36}{results[name]['median_us']:>14.2f} us  (best {results[name]['best_us']:.2f})")
+    return results
+
+def load_baseline():
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+def baseline_results(name_filter=None, full=False, rounds=SAVE_ROUNDS):
+    runs = [run_all(name_filter, full) for _ in range(rounds)]
+    results = {}
+    for name in runs[0]:
+        bests = [run[name]["best_us"] for run in runs]
+        best = statistics.median(bests)
+        results[name] = {"median_us": statistics.median(run[name]["median_us"] for run in runs),
+                         "best_us": best,
+                         # Median absolute deviation: one outlier round doesn't inflate it
+                         "noise": round(statistics.median(abs(b - best) for b in bests) / best, 3)}
+    return results
+
+def save_baseline(results):
+    os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+    baseline = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor() or platform.machine()},
+        "threshold": DEFAULT_THRESHOLD,
+        "results": results,
+    }
+    with open(BASELINE_PATH, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Baseline written to {BASELINE_PATH}")
+
+def compare(results, baseline, threshold, noise_aware=False):
+    allowed, changes = {}, {}
+    for name, current in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        allowed[name] = threshold
+        if noise_aware:
+            allowed[name] += min(2 * old.get("noise", 0), threshold)
+        changes[name] = current["best_us"] / old["best_us"] - 1
+
+    # A slow spell on the machine (a noisy neighbour, a frequency dip) can
+    # last seconds, so flagged cases are re-measured after the whole suite,
+    # in later time windows; a real regression is still there every time
+    for _ in range(CONFIRM_RUNS):
+        flagged = [name for name in changes if changes[name] > allowed[name]]
+        if not flagged:
+            break
+        for name in flagged:
+            best = run_case(name)["best_us"]
+            changes[name] = min(changes[name], best / baseline["results"][name]["best_us"] - 1)
+
+    regressions = []
+    print(f"=== vs baseline (threshold +{threshold:.0%}{', noise-aware' if noise_aware else ''}) ===")
+    for name in results:
+        if name not in changes:
+            print(f"{name:<36}{'new':>14}")
+            continue
+        flag = "REGRESSION" if changes[name] > allowed[name] else ""
+        print(f"{name:<36}{changes[name]:>+13.1%}  (allowed +{allowed[name]:.0%})  {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["run", "save", "compare"])
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--full", action="store_true", help="include the 1M-item cases")
+    parser.add_argument("--rounds", type=int, default=SAVE_ROUNDS, help="save: suite runs to take the median of")
+    parser.add_argument("--noise-aware", action="store_true",
+                        help="compare: widen each case's threshold by twice its recorded noise (at most 2x)")
+    parser.add_argument("--threshold", type=float,
+                        help="allowed slowdown as a fraction (default: the baseline file's)")
+    args = parser.parse_args()
+
+    if args.command == "save":
+        save_baseline(baseline_results(args.filter, args.full, args.rounds))
+        return
+    results = run_all(args.filter, args.full)
+    if args.command == "compare":
+        baseline = load_baseline()
+        threshold = args.threshold if args.threshold is not None else baseline.get("threshold", DEFAULT_THRESHOLD)
+        regressions = compare(results, baseline, threshold, args.noise_aware)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Build a trimmed, bytecode-compiled deployment zip for a task Lambda.
+
+Vendored dependencies (--requirements) are installed for the Lambda platform,
+botocore service models other than --keep-services are dropped, and when the
+running interpreter matches --python-version every module is precompiled so
+the read-only /var/task never has to be compiled again on a cold start.
+
+Examples:
+    python build_artifact.py --app dynamodb --output dist/dynamodb.zip
+    python build_artifact.py --app rds --requirements requirements-lambda.txt --output dist/rds.zip
+"""
+import argparse
+import compileall
+import fnmatch
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules both handlers import; copied into every artifact
+SHARED_DIR = os.path.join(REPO_ROOT, "lambda-shared")
+
+APPS = {
+    "rds": {
+        "source_dir": os.path.join(REPO_ROOT, "CDK-lambda-RDS-CRUD", "lambda_src"),
+        "include": ["*.py", "migrations/*.sql"],
+        "exclude": [],
+    },
+    "dynamodb": {
+        "source_dir": os.path.join(REPO_ROOT, "lambda-dynamoDB-CRUD"),
+        "include": ["*.py"],
+        "exclude": ["deploy.py", "test_api.py"],
+    },
+}
+
+# Services the handlers actually call; every other botocore model is dead weight
+DEFAULT_KEEP_SERVICES = ["dynamodb", "secretsmanager", "rds", "sts", "sso", "sso-oidc"]
+
+STRIP_PATTERNS = ["__pycache__", "*.dist-info/RECORD", "tests", "*.pyi"]
+
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+def copy_sources(app, build_dir):
+    source_dir = app["source_dir"]
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), source_dir)
+            if any(fnmatch.fnmatch(rel, p) for p in app["include"]) and \
+                    not any(fnmatch.fnmatch(rel, p) for p in app["exclude"]):
+                os.makedirs(os.path.join(build_dir, os.path.dirname(rel)), exist_ok=True)
+                shutil.copy2(os.path.join(root, name), os.path.join(build_dir, rel))
+    for name in os.listdir(SHARED_DIR):
+        if name.endswith(".py"):
+            shutil.copy2(os.path.join(SHARED_DIR, name), os.path.join(build_dir, name))
+
+def vendor(requirements, build_dir, python_version, platform):
+    subprocess.run([
+        sys.executable, "-m", "pip", "install", "--quiet", "--requirement", requirements,
+        "--target", build_dir, "--platform", platform, "--python-version", python_version,
+        "--only-binary=:all:", "--implementation", "cp",
+    ], check=True)
+
+def strip(build_dir, keep_services):
+    removed = 0
+    data_dir = os.path.join(build_dir, "botocore", "data")
+    if os.path.isdir(data_dir):
+        for entry in os.listdir(data_dir):
+            path = os.path.join(data_dir, entry)
+            if os.path.isdir(path) and entry not in keep_services:
+                removed += dir_size(path)
+                shutil.rmtree(path)
+    for root, dirs, files in os.walk(build_dir, topdown=False):
+        for name in dirs + files:
+            rel = os.path.relpath(os.path.join(root, name), build_dir)
+            if any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel, p) for p in STRIP_PATTERNS):
+                path = os.path.join(root, name)
+                if os.path.isdir(path):
+                    removed += dir_size(path)
+                    shutil.rmtree(path)
+                elif os.path.exists(path):
+                    removed += os.path.getsize(path)
+                    os.remove(path)
+    return removed
+
+def precompile(build_dir, python_version):
+    running = f"{sys.version_info.major}.{sys.version_info.minor}"
+    if running != python_version:
+        print(f"Skipping bytecode: running Python {running}, target runtime is {python_version}. "
+              f"Run this script with python{python_version} to precompile.")
+        return False
+    # Unchecked hashes: the runtime trusts the .pyc without stat-ing the source
+    compileall.compile_dir(build_dir, quiet=1, workers=0,
+                           invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+    return True
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def write_zip(build_dir, output):
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    paths = sorted(os.path.relpath(os.path.join(root, f), build_dir)
+                   for root, _, files in os.walk(build_dir) for f in files)
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as z:
+        for rel in paths:
+            info = zipfile.ZipInfo(rel.replace(os.sep, "/"), date_time=ZIP_DATE_TIME)
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(os.path.join(build_dir, rel), "rb") as f:
+                z.writestr(info, f.read())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=sorted(APPS), required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--requirements", help="pip requirements to vendor into the artifact")
+    parser.add_argument("--python-version", default="3.12", help="Lambda runtime Python version")
+    parser.add_argument("--platform", default="manylinux2014_x86_64")
+    parser.add_argument("--keep-services", nargs="+", default=DEFAULT_KEEP_SERVICES)
+    parser.add_argument("--build-dir", help="keep the unpacked build here instead of a temp dir")
+    args = parser.parse_args()
+
+    build_dir = args.build_dir or tempfile.mkdtemp(prefix="lambda-build-")
+    try:
+        copy_sources(APPS[args.app], build_dir)
+        if args.requirements:
+            vendor(args.requirements, build_dir, args.python_version, args.platform)
+        before = dir_size(build_dir)
+        removed = strip(build_dir, set(args.keep_services))
+        compiled = precompile(build_dir, args.python_version)
+        write_zip(build_dir, args.output)
+    finally:
+        if not args.build_dir:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    print(f"Unpacked: {before / 1e6:.1f} MB, stripped {removed / 1e6:.1f} MB, "
+          f"bytecode {'included' if compiled else 'not included'}")
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1e6:.2f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Measure handler cold-start (init) time, locally or on a deployed function.
+
+Local mode imports the handler in fresh interpreters, the same work Lambda
+does during Init, and can compare the working tree with another git ref or
+with a built artifact. AWS mode forces real cold starts by touching an
+environment variable before each invoke and reads "Init Duration" from the
+REPORT log line.
+
+Examples:
+    python coldstart.py local --app rds --runs 20 --before HEAD~1
+    python coldstart.py local --app dynamodb --artifact dist/dynamodb.zip
+    python coldstart.py local --app rds --importtime      # top imports by cumulative time
+    python coldstart.py aws --function TasksFunction --runs 10
+"""
+import argparse
+import base64
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_DIR = os.path.join(REPO_ROOT, "lambda-shared")
+
+APPS = {
+    "rds": ("CDK-lambda-RDS-CRUD/lambda_src", "handler"),
+    "dynamodb": ("lambda-dynamoDB-CRUD", "app"),
+}
+
+# Enough configuration for the handlers to import without reaching AWS
+LOCAL_ENV = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "local",
+    "AWS_SECRET_ACCESS_KEY": "local",
+    "TABLE_NAME": "Tasks",
+    "DB_SECRET": "local",
+}
+
+IMPORT_SNIPPET = (
+    "import sys, time; sys.path[:0] = [{path!r}, {shared!r}]; "
+    "t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+)
+
+def summarize(samples_ms):
+    samples_ms = sorted(samples_ms)
+    return {
+        "runs": len(samples_ms),
+        "median_ms": round(statistics.median(samples_ms), 1),
+        "p90_ms": round(samples_ms[int(0.9 * (len(samples_ms) - 1))], 1),
+        "min_ms": round(samples_ms[0], 1),
+    }
+
+def measure_local(source_dir, module, runs):
+    env = dict(os.environ, **LOCAL_ENV)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(path=source_dir, shared=SHARED_DIR, module=module)],
+                             env=env, capture_output=True, text=True, check=True, cwd=source_dir)
+        samples.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    return summarize(samples)
+
+def import_profile(source_dir, module, top):
+    env = dict(os.environ, **LOCAL_ENV, PYTHONPATH=SHARED_DIR)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         env=env, capture_output=True, text=True, check=True, cwd=source_dir)
+    rows = []
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), int(match.group(1)), len(match.group(3)) // 2, match.group(4)))
+    print(f"{'cumulative':>12}{'self':>10}  module")
+    for cumulative, self_us, depth, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>10.1f}ms{self_us / 1000:>8.1f}ms  {'  ' * depth}{name}")
+
+def checkout_ref(ref, target):
+    archive = subprocess.run(["git", "-C", REPO_ROOT, "archive", ref], capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+
+def local(args):
+    subdir, module = APPS[args.app]
+    if args.importtime:
+        import_profile(os.path.join(REPO_ROOT, subdir), module, args.top)
+        return
+
+    results = {"current": measure_local(os.path.join(REPO_ROOT, subdir), module, args.runs)}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.before:
+            checkout_ref(args.before, tmp)
+            results[f"before ({args.before})"] = measure_local(os.path.join(tmp, subdir), module, args.runs)
+        if args.artifact:
+            artifact_dir = os.path.join(tmp, "artifact")
+            with zipfile.ZipFile(args.artifact) as z:
+                z.extractall(artifact_dir)
+            results[f"artifact ({os.path.basename(args.artifact)})"] = measure_local(artifact_dir, module, args.runs)
+    report(results, args.output)
+
+def aws(args):
+    import boto3
+    client = boto3.client("lambda")
+    event = json.load(open(args.event)) if args.event else {"httpMethod": "GET", "path": "/tasks"}
+    config = client.get_function_configuration(FunctionName=args.function)
+    variables = config.get("Environment", {}).get("Variables", {})
+    init, total = [], []
+    for i in range(args.runs):
+        # Any configuration change retires the warm containers
+        variables["COLDSTART_NONCE"] = f"{time.time()}-{i}"
+        client.update_function_configuration(FunctionName=args.function,
+                                             Environment={"Variables": variables})
+        client.get_waiter("function_updated_v2").wait(FunctionName=args.function)
+        result = client.invoke(FunctionName=args.function, LogType="Tail",
+                               Payload=json.dumps(event).encode())
+        log = base64.b64decode(result["LogResult"]).decode()
+        init_match = re.search(r"Init Duration: ([\d.]+) ms", log)
+        duration_match = re.search(r"\tDuration: ([\d.]+) ms", log)
+        if init_match:
+            init.append(float(init_match.group(1)))
+            total.append(float(init_match.group(1)) + float(duration_match.group(1)))
+        print(f"run {i + 1}: init {init_match.group(1) if init_match else '-'} ms, "
+              f"duration {duration_match.group(1) if duration_match else '-'} ms")
+    variables.pop("COLDSTART_NONCE", None)
+    client.update_function_configuration(FunctionName=args.function, Environment={"Variables": variables})
+    results = {"init": summarize(init), "init+first invoke": summarize(total)} if init else {}
+    report(results, args.output)
+
+def report(results, output):
+    print(f"{'':<32}{'runs':>6}{'median':>10}{'p90':>10}{'min':>10}")
+    for name, s in results.items():
+        print(f"{name:<32}{s['runs']:>6}{s['median_ms']:>8}ms{s['p90_ms']:>8}ms{s['min_ms']:>8}ms")
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    local_parser = sub.add_parser("local", help="time handler imports in fresh interpreters")
+    local_parser.add_argument("--app", choices=sorted(APPS), required=True)
+    local_parser.add_argument("--runs", type=int, default=15)
+    local_parser.add_argument("--before", help="git ref to compare against, e.g. HEAD~1")
+    local_parser.add_argument("--artifact", help="also measure a zip built by build_artifact.py")
+    local_parser.add_argument("--importtime", action="store_true", help="print an import-time profile instead")
+    local_parser.add_argument("--top", type=int, default=25)
+    local_parser.add_argument("--output", help="write results as JSON")
+
+    aws_parser = sub.add_parser("aws", help="force and measure real cold starts")
+    aws_parser.add_argument("--function", required=True)
+    aws_parser.add_argument("--runs", type=int, default=10)
+    aws_parser.add_argument("--event", help="JSON event file to invoke with")
+    aws_parser.add_argument("--output", help="write results as JSON")
+
+    args = parser.parse_args()
+    if args.mode == "local":
+        local(args)
+    else:
+        aws(args)
+
+if __name__ == "__main__":
+    main()
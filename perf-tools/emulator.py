@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""Local API Gateway emulator for the task Lambda handlers.
+
+Turns HTTP requests into API Gateway REST proxy events and invokes the real
+handler in a pool of worker processes, each one standing in for a Lambda
+container. A request that needs a new worker is a cold start; every response
+reports init (module import) and invoke time.
+
+Backends:
+    dynamodb  DynamoDB served by a local moto server (pip install "moto[server]")
+    rds       a local PostgreSQL (e.g. docker run -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:15)
+              with the DB secret served by the same moto server
+
+Examples:
+    python emulator.py --app dynamodb --port 3000
+    python emulator.py --app rds --pg-host localhost --pg-password postgres --containers 2
+    python emulator.py --app dynamodb --record workload.jsonl   # capture events for power_tuning.py
+"""
+import argparse
+import base64
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules both handlers import; deployment copies them into each package
+SHARED_DIR = os.path.join(REPO_ROOT, "lambda-shared")
+
+APPS = {
+    "rds": {
+        "source_dir": os.path.join(REPO_ROOT, "CDK-lambda-RDS-CRUD", "lambda_src"),
+        "module": "handler",
+        "resources": ["/tasks", "/tasks/batch", "/tasks/{id}"],
+    },
+    "dynamodb": {
+        "source_dir": os.path.join(REPO_ROOT, "lambda-dynamoDB-CRUD"),
+        "module": "app",
+        "resources": ["/tasks", "/tasks/batch-write", "/tasks/batch-get", "/tasks/{id}"],
+    },
+}
+
+LOCAL_TABLE_NAME = "Tasks"
+LOCAL_SECRET_NAME = "local/task-db"
+
+# ----------------------------
+# Event translation
+# ----------------------------
+
+def match_resource(resources, path):
+    """Return (resource template, pathParameters) for `path`; static segments win over {params}."""
+    segments = path.strip("/").split("/")
+    best = None
+    for resource in resources:
+        parts = resource.strip("/").split("/")
+        if len(parts) != len(segments):
+            continue
+        params = {}
+        for part, segment in zip(parts, segments):
+            if part.startswith("{") and part.endswith("}"):
+                params[part[1:-1]] = segment
+            elif part != segment:
+                break
+        else:
+            if best is None or len(params) < len(best[1]):
+                best = (resource, params)
+    return best
+
+def build_event(method, raw_path, headers, body, resources):
+    url = urlsplit(raw_path)
+    matched = match_resource(resources, url.path)
+    if matched is None:
+        return None
+    resource, params = matched
+    query = dict(parse_qsl(url.query, keep_blank_values=True))
+    return {
+        "resource": resource,
+        "path": url.path,
+        "httpMethod": method,
+        "headers": headers,
+        "queryStringParameters": query or None,
+        "pathParameters": params or None,
+        "body": body.decode() if body else None,
+        "isBase64Encoded": False,
+        "requestContext": {
+            "stage": "local",
+            "requestId": str(uuid.uuid4()),
+            "httpMethod": method,
+            "resourcePath": resource,
+        },
+    }
+
+class LocalContext:
+    """Just enough of the Lambda context object for the handlers."""
+
+    def __init__(self, timeout_s=30):
+        self.aws_request_id = str(uuid.uuid4())
+        self.function_name = "local-emulator"
+        self.memory_limit_in_mb = 512
+        self._deadline = time.monotonic() + timeout_s
+
+    def get_remaining_time_in_millis(self):
+        return int(max(0.0, self._deadline - time.monotonic()) * 1000)
+
+# ----------------------------
+# Containers
+# ----------------------------
+
+def container_main(app_name, env, conn):
+    """Worker process body: import the handler once (init), then serve invocations."""
+    os.environ.update(env)
+    sys.path.insert(0, SHARED_DIR)
+    sys.path.insert(0, APPS[app_name]["source_dir"])
+    started = time.perf_counter()
+    module = importlib.import_module(APPS[app_name]["module"])
+    conn.send(("ready", (time.perf_counter() - started) * 1000))
+    while True:
+        event = conn.recv()
+        if event is None:
+            return
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            result = module.lambda_handler(event, LocalContext())
+        except Exception as e:
+            result = {"statusCode": 502, "body": json.dumps({"message": "Internal server error",
+                                                             "error": repr(e)})}
+        conn.send(("done", result, (time.perf_counter() - started) * 1000,
+                   (time.process_time() - cpu_started) * 1000))
+
+class Container:
+    def __init__(self, ctx, app_name, env):
+        self.id = uuid.uuid4().hex[:8]
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=container_main, args=(app_name, env, child), daemon=True)
+        self.process.start()
+        _, self.init_ms = self.conn.recv()
+        self.last_used = time.monotonic()
+        self.invocations = 0
+        self.last_cpu_ms = 0.0
+
+    def invoke(self, event):
+        self.conn.send(event)
+        _, result, invoke_ms, self.last_cpu_ms = self.conn.recv()
+        self.last_used = time.monotonic()
+        self.invocations += 1
+        return result, invoke_ms
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.kill()
+
+class ContainerPool:
+    """Hands out warm containers, starting cold ones up to `max_containers`."""
+
+    def __init__(self, app_name, env, max_containers, idle_timeout):
+        self.ctx = multiprocessing.get_context("spawn")
+        self.app_name = app_name
+        self.env = env
+        self.max_containers = max_containers
+        self.idle_timeout = idle_timeout
+        self.idle = []
+        self.total = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                self._reap_idle()
+                if self.idle:
+                    return self.idle.pop(), False
+                if self.total < self.max_containers:
+                    self.total += 1
+                    break
+                self.cond.wait()
+        try:
+            return Container(self.ctx, self.app_name, self.env), True
+        except Exception:
+            with self.cond:
+                self.total -= 1
+                self.cond.notify()
+            raise
+
+    def release(self, container):
+        with self.cond:
+            self.idle.append(container)
+            self.cond.notify()
+
+    def discard(self, container):
+        container.stop()
+        with self.cond:
+            self.total -= 1
+            self.cond.notify()
+
+    def _reap_idle(self):
+        # Like Lambda, containers idle for too long are reclaimed and the next request is cold
+        now = time.monotonic()
+        for container in [c for c in self.idle if now - c.last_used > self.idle_timeout]:
+            self.idle.remove(container)
+            container.stop()
+            self.total -= 1
+
+    def shutdown(self):
+        with self.cond:
+            for container in self.idle:
+                container.stop()
+            self.idle = []
+
+# ----------------------------
+# Local backends
+# ----------------------------
+
+def start_backends(args):
+    """Start a moto server and seed it; returns (server, env for containers)."""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit('The emulator needs moto for local AWS services: pip install "moto[server]"')
+    import boto3
+
+    # Keep the moto request log out of the per-invocation timing lines
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=args.moto_port, verbose=False)
+    server.start()
+    endpoint = f"http://127.0.0.1:{args.moto_port}"
+    env = {
+        "AWS_ENDPOINT_URL": endpoint,
+        "AWS_ACCESS_KEY_ID": "local",
+        "AWS_SECRET_ACCESS_KEY": "local",
+        "AWS_DEFAULT_REGION": "us-east-1",
+    }
+    session = boto3.session.Session(aws_access_key_id="local", aws_secret_access_key="local",
+                                    region_name="us-east-1")
+
+    if args.app == "dynamodb":
+        session.client("dynamodb", endpoint_url=endpoint).create_table(
+            TableName=LOCAL_TABLE_NAME,
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        env["TABLE_NAME"] = LOCAL_TABLE_NAME
+    else:
+        session.client("secretsmanager", endpoint_url=endpoint).create_secret(
+            Name=LOCAL_SECRET_NAME,
+            SecretString=json.dumps({"host": args.pg_host, "username": args.pg_user,
+                                     "password": args.pg_password}),
+        )
+        env.update({"DB_SECRET": LOCAL_SECRET_NAME, "DB_NAME": args.pg_database,
+                    "DB_PORT": str(args.pg_port)})
+    return server, env
+
+# ----------------------------
+# HTTP front end
+# ----------------------------
+
+def make_request_handler(pool, resources, record=None):
+    class EmulatorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            event = build_event(self.command, self.path, dict(self.headers), body, resources)
+            if event is None:
+                return self._reply(403, {"Content-Type": "application/json"},
+                                   b'{"message":"Missing Authentication Token"}')
+            if record is not None:
+                record.write(json.dumps(event) + "\n")
+                record.flush()
+
+            container, cold = pool.acquire()
+            try:
+                result, invoke_ms = container.invoke(event)
+            except (EOFError, OSError):
+                pool.discard(container)
+                return self._reply(502, {}, b'{"message":"Container crashed"}')
+            pool.release(container)
+
+            payload = result.get("body") or ""
+            data = base64.b64decode(payload) if result.get("isBase64Encoded") else payload.encode()
+            headers = dict(result.get("headers") or {})
+            init_ms = container.init_ms if cold else 0.0
+            headers.update({
+                "X-Emulator-Container": container.id,
+                "X-Emulator-Cold-Start": str(cold).lower(),
+                "X-Emulator-Init-Ms": f"{init_ms:.2f}",
+                "X-Emulator-Invoke-Ms": f"{invoke_ms:.2f}",
+                "X-Emulator-Cpu-Ms": f"{container.last_cpu_ms:.2f}",
+            })
+            print(json.dumps({"method": self.command, "path": self.path,
+                              "status": result.get("statusCode"), "container": container.id,
+                              "cold": cold, "init_ms": round(init_ms, 2),
+                              "invoke_ms": round(invoke_ms, 2),
+                              "cpu_ms": round(container.last_cpu_ms, 2)}), flush=True)
+            self._reply(result.get("statusCode", 200), headers, data)
+
+        def _reply(self, status, headers, data):
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _handle
+
+    return EmulatorHandler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=sorted(APPS), required=True)
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--containers", type=int, default=4, help="max concurrent containers")
+    parser.add_argument("--idle-timeout", type=float, default=300.0,
+                        help="seconds before an idle container is reclaimed")
+    parser.add_argument("--moto-port", type=int, default=5001)
+    parser.add_argument("--record", help="append every event as a JSON line, for power_tuning.py --events")
+    parser.add_argument("--pg-host", default="localhost")
+    parser.add_argument("--pg-port", type=int, default=5432)
+    parser.add_argument("--pg-user", default="postgres")
+    parser.add_argument("--pg-password", default="postgres")
+    parser.add_argument("--pg-database", default="postgres")
+    args = parser.parse_args()
+
+    moto_server, env = start_backends(args)
+    pool = ContainerPool(args.app, env, args.containers, args.idle_timeout)
+    record = open(args.record, "a") if args.record else None
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_request_handler(pool, APPS[args.app]["resources"], record))
+    print(f"Emulating {args.app} API on http://127.0.0.1:{args.port} "
+          f"(up to {args.containers} containers)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+        moto_server.stop()
+        if record is not None:
+            record.close()
+
+if __name__ == "__main__":
+    main()
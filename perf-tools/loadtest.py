@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""Concurrent load generator for the RDS and DynamoDB task APIs.
+
+Examples:
+    python loadtest.py --api dynamodb --url https://abc.execute-api.us-east-1.amazonaws.com/prod
+    python loadtest.py --api rds --local --concurrency 32 --duration 10 --output run.json
+    python loadtest.py --api rds --local --compare run.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPERATIONS = ("create", "read", "update", "delete")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+# ----------------------------
+# Request shapes per API
+# ----------------------------
+
+def rds_request(op, task_id):
+    if op == "create":
+        return "POST", "/tasks", {"description": "load test task", "status": "pending"}
+    if op == "read":
+        return "GET", "/tasks?limit=20", None
+    if op == "update":
+        return "PUT", f"/tasks/{task_id}", {"status": "done"}
+    return "DELETE", f"/tasks/{task_id}", None
+
+def dynamodb_request(op, task_id):
+    if op == "create":
+        return "POST", "/tasks", {"id": str(uuid.uuid4()), "title": "load test task", "status": "pending"}
+    if op == "read":
+        return "GET", f"/tasks/{task_id}", None
+    if op == "update":
+        return "PUT", f"/tasks/{task_id}", {"status": "done"}
+    return "DELETE", f"/tasks/{task_id}", None
+
+API_REQUESTS = {"rds": rds_request, "dynamodb": dynamodb_request}
+
+# Operations that need an existing task id for each API
+NEEDS_ID = {
+    "rds": {"update", "delete"},
+    "dynamodb": {"read", "update", "delete"},
+}
+
+# ----------------------------
+# Local stand-in endpoint
+# ----------------------------
+
+class LocalTaskAPI(BaseHTTPRequestHandler):
+    """In-memory imitation of both task APIs, for running the harness offline."""
+    tasks = {}
+    lock = threading.Lock()
+    next_id = 1
+    latency_ms = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        parts = self.path.split("?")[0].rstrip("/").split("/")
+        task_id = parts[-1] if len(parts) >= 2 and parts[-2] == "tasks" else None
+        cls = LocalTaskAPI
+        with cls.lock:
+            if self.command == "POST" and task_id is None:
+                if "id" not in body:
+                    body["id"] = str(cls.next_id)
+                    cls.next_id += 1
+                cls.tasks[str(body["id"])] = body
+                return self._send(201, body)
+            if self.command == "GET" and task_id is None:
+                return self._send(200, {"items": list(cls.tasks.values())[:20], "next": None})
+            if task_id not in cls.tasks:
+                return self._send(404, {"error": "Task not found"})
+            if self.command == "GET":
+                return self._send(200, cls.tasks[task_id])
+            if self.command == "PUT":
+                cls.tasks[task_id].update(body)
+                return self._send(200, cls.tasks[task_id])
+            if self.command == "DELETE":
+                del cls.tasks[task_id]
+                return self._send(204)
+        return self._send(400, {"error": "Invalid request"})
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+def start_local_server(latency_ms=0.0):
+    LocalTaskAPI.latency_ms = latency_ms
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LocalTaskAPI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+# ----------------------------
+# Load generation
+# ----------------------------
+
+def http_call(url, method, body, timeout):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+class Stats:
+    def __init__(self):
+        self.latencies = {op: [] for op in OPERATIONS}
+        self.statuses = {op: {} for op in OPERATIONS}
+        self.failures = {op: 0 for op in OPERATIONS}
+
+    def record(self, op, status, latency_ms):
+        self.latencies[op].append(latency_ms)
+        key = str(status)
+        self.statuses[op][key] = self.statuses[op].get(key, 0) + 1
+        # 4xx from racing deletes are expected under a mixed workload; 5xx and transport errors are not
+        if status == "exception" or status >= 500:
+            self.failures[op] += 1
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+def histogram(values):
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for value in values:
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+def summarize(values, failures, statuses, elapsed):
+    values = sorted(values)
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(failures / len(values), 4) if values else 0.0,
+        "statuses": statuses,
+        "mean_ms": round(sum(values) / len(values), 2) if values else None,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": round(values[-1], 2) if values else None,
+        "histogram": histogram(values),
+    }
+
+def build_report(stats, elapsed, config):
+    ops = {op: summarize(stats.latencies[op], stats.failures[op], stats.statuses[op], elapsed)
+           for op in OPERATIONS if stats.latencies[op]}
+    all_statuses = {}
+    for op in OPERATIONS:
+        for status, count in stats.statuses[op].items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    overall = summarize([v for op in OPERATIONS for v in stats.latencies[op]],
+                        sum(stats.failures.values()), all_statuses, elapsed)
+    return {"config": config, "elapsed_s": round(elapsed, 3), "overall": overall, "operations": ops}
+
+class RateLimiter:
+    """Spaces request starts evenly at `rate` per second across all workers."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            slot = max(self.next_slot, time.monotonic())
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def worker(args, base_url, weights, known_ids, limiter, stats, deadline, executor):
+    loop = asyncio.get_running_loop()
+    build_request = API_REQUESTS[args.api]
+    while time.monotonic() < deadline:
+        op = random.choices(OPERATIONS, weights=weights)[0]
+        task_id = None
+        if op in NEEDS_ID[args.api]:
+            if not known_ids:
+                op = "create"
+            else:
+                task_id = random.choice(known_ids)
+                if op == "delete":
+                    known_ids.remove(task_id)
+        method, path, body = build_request(op, task_id)
+        await limiter.wait()
+        started = time.perf_counter()
+        try:
+            status, raw = await loop.run_in_executor(
+                executor, http_call, base_url + path, method, body, args.timeout)
+        except Exception:
+            status, raw = "exception", b""
+        stats.record(op, status, (time.perf_counter() - started) * 1000)
+        if op == "create" and status == 201:
+            created = json.loads(raw)
+            if created.get("id") is not None:
+                known_ids.append(created["id"])
+
+def parse_mix(mix):
+    weights = dict.fromkeys(OPERATIONS, 0.0)
+    for part in mix.split(","):
+        op, _, weight = part.partition("=")
+        if op.strip() not in weights:
+            raise ValueError(f"Unknown operation in --mix: {op}")
+        weights[op.strip()] = float(weight)
+    return [weights[op] for op in OPERATIONS]
+
+async def run(args, base_url):
+    weights = parse_mix(args.mix)
+    stats = Stats()
+    known_ids = []
+    limiter = RateLimiter(args.rate)
+    started = time.monotonic()
+    deadline = started + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        await asyncio.gather(*[
+            worker(args, base_url, weights, known_ids, limiter, stats, deadline, executor)
+            for _ in range(args.concurrency)
+        ])
+    return stats, time.monotonic() - started
+
+def print_report(report):
+    print(f"{'op':<8}{'reqs':>8}{'rps':>10}{'err%':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    rows = list(report["operations"].items()) + [("overall", report["overall"])]
+    for op, s in rows:
+        print(f"{op:<8}{s['requests']:>8}{s['throughput_rps']:>10}{s['error_rate'] * 100:>7.2f}%"
+              f"{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}")
+
+def compare(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"=== Compared with {baseline_path} ===")
+    for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate"):
+        old, new = baseline["overall"].get(key), report["overall"].get(key)
+        if old:
+            print(f"{key:<15}{old:>10} -> {new:<10} ({(new - old) / old * 100:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api", choices=sorted(API_REQUESTS), required=True)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="API base URL without trailing slash")
+    target.add_argument("--local", action="store_true", help="run against an in-process stand-in server")
+    parser.add_argument("--local-latency-ms", type=float, default=0.0,
+                        help="artificial latency added by the stand-in server")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0.0, help="max requests per second (0 = unlimited)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", default="create=1,read=4,update=2,delete=1")
+    parser.add_argument("--timeout", type=float, default=10.0, help="per-request timeout in seconds")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if args.local:
+        server, base_url = start_local_server(args.local_latency_ms)
+    try:
+        stats, elapsed = asyncio.run(run(args, base_url))
+    finally:
+        if server:
+            server.shutdown()
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    report = build_report(stats, elapsed, config)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""Sweep Lambda memory sizes and report cost against latency.
+
+aws    Re-configures a deployed function to each memory size, replays the
+       workload with real invokes and reads Duration / Billed Duration from
+       the REPORT log line. The original memory size is restored afterwards.
+local  Replays the workload through the emulator's container (warm, after
+       one discarded cold start) and measures wall and CPU time per event.
+       Lambda gives a function CPU in proportion to memory, one full vCPU at
+       1769 MB, so each size is estimated by scaling only the CPU part:
+           est_ms = cpu_ms * cpu_factor * max(1, 1769 / memory) + (wall_ms - cpu_ms)
+       --cpu-factor calibrates for this machine being faster or slower than
+       a Lambda vCPU (compare one aws run against local at the same size).
+
+The workload is a JSONL file of API Gateway events (--events), e.g. recorded
+with `emulator.py --record`; without one a small built-in mix is used.
+
+Examples:
+    python power_tuning.py local --app dynamodb --invocations 200
+    python power_tuning.py local --app dynamodb --events workload.jsonl --memory 256 512 1024 2048
+    python power_tuning.py aws --function TaskLambda --events workload.jsonl --invocations 50 --output curve.json
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import re
+import statistics
+import sys
+
+PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, PERF_DIR)
+
+DEFAULT_MEMORY = [128, 256, 512, 1024, 1769, 3008]
+FULL_VCPU_MB = 1769
+
+# us-east-1 on-demand prices; override with --price-gb-s / --price-request
+PRICE_PER_GB_S = {"x86_64": 0.0000166667, "arm64": 0.0000133334}
+PRICE_PER_REQUEST = 0.20 / 1_000_000
+
+# ----------------------------
+# Workload
+# ----------------------------
+
+def default_workload(app, n):
+    import emulator
+    resources = emulator.APPS[app]["resources"]
+    events = []
+    for i in range(n):
+        if app == "dynamodb":
+            task_id = f"tune-{i % 50}"
+            if i < 50:
+                request = ("POST", "/tasks", {"id": task_id, "title": f"task {i}", "status": "pending"})
+            elif i % 4 == 0:
+                request = ("PUT", f"/tasks/{task_id}", {"status": "done"})
+            else:
+                request = ("GET", f"/tasks/{task_id}", None)
+        else:
+            if i % 5 == 0:
+                request = ("POST", "/tasks", {"description": f"task {i}"})
+            else:
+                request = ("GET", "/tasks?limit=50", None)
+        method, path, body = request
+        events.append(emulator.build_event(method, path, {}, json.dumps(body).encode() if body else b"",
+                                           resources))
+    return events
+
+def load_workload(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def replay_order(events, invocations):
+    return [events[i % len(events)] for i in range(invocations)]
+
+# ----------------------------
+# Measurements
+# ----------------------------
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+def summarize(memory_mb, durations_ms, billed_ms, price_gb_s, price_request):
+    cost = statistics.mean(b / 1000 * memory_mb / 1024 * price_gb_s + price_request for b in billed_ms)
+    return {
+        "memory_mb": memory_mb,
+        "p50_ms": round(percentile(durations_ms, 0.50), 2),
+        "p95_ms": round(percentile(durations_ms, 0.95), 2),
+        "mean_billed_ms": round(statistics.mean(billed_ms), 2),
+        "cost_per_1m_usd": round(cost * 1_000_000, 4),
+    }
+
+def local(args):
+    import emulator
+    events = load_workload(args.events) if args.events else default_workload(args.app, args.invocations)
+    backend_args = argparse.Namespace(app=args.app, moto_port=args.moto_port, pg_host=args.pg_host,
+                                      pg_port=args.pg_port, pg_user=args.pg_user,
+                                      pg_password=args.pg_password, pg_database=args.pg_database)
+    moto_server, env = emulator.start_backends(backend_args)
+    env["METRICS_ENABLED"] = "false"
+    pool = emulator.ContainerPool(args.app, env, max_containers=1, idle_timeout=float("inf"))
+    samples = []
+    try:
+        container, _ = pool.acquire()
+        print(f"Cold start (init): {container.init_ms:.1f} ms, discarded")
+        container.invoke(events[0])
+        for event in replay_order(events, args.invocations):
+            _, wall_ms = container.invoke(event)
+            samples.append((wall_ms, min(container.last_cpu_ms, wall_ms)))
+        pool.release(container)
+    finally:
+        pool.shutdown()
+        moto_server.stop()
+
+    cpu_share = sum(c for _, c in samples) / max(sum(w for w, _ in samples), 1e-9)
+    print(f"Replayed {len(samples)} invocations locally; {cpu_share:.0%} of handler time is CPU")
+    results = []
+    for memory_mb in args.memory:
+        scale = args.cpu_factor * max(1.0, FULL_VCPU_MB / memory_mb)
+        durations = [cpu * scale + (wall - cpu) for wall, cpu in samples]
+        billed = [max(1, math.ceil(d)) for d in durations]
+        results.append(summarize(memory_mb, durations, billed, args.price_gb_s or PRICE_PER_GB_S[args.arch],
+                                 args.price_request))
+    return results
+
+REPORT_RE = re.compile(r"\tDuration: ([\d.]+) ms\tBilled Duration: (\d+) ms")
+
+def aws(args):
+    import boto3
+    client = boto3.client("lambda")
+    if args.events:
+        events = load_workload(args.events)
+    elif args.event:
+        events = [json.load(open(args.event))]
+    else:
+        events = [{"httpMethod": "GET", "path": "/tasks", "resource": "/tasks"}]
+    config = client.get_function_configuration(FunctionName=args.function)
+    original_memory = config["MemorySize"]
+    arch = (config.get("Architectures") or ["x86_64"])[0]
+    price_gb_s = args.price_gb_s or PRICE_PER_GB_S[arch]
+
+    results = []
+    try:
+        for memory_mb in args.memory:
+            client.update_function_configuration(FunctionName=args.function, MemorySize=memory_mb)
+            client.get_waiter("function_updated_v2").wait(FunctionName=args.function)
+            durations, billed = [], []
+            # The first invoke after a configuration change is a cold start
+            client.invoke(FunctionName=args.function, Payload=json.dumps(events[0]).encode())
+            for event in replay_order(events, args.invocations):
+                result = client.invoke(FunctionName=args.function, LogType="Tail",
+                                       Payload=json.dumps(event).encode())
+                match = REPORT_RE.search(base64.b64decode(result["LogResult"]).decode())
+                if match:
+                    durations.append(float(match.group(1)))
+                    billed.append(int(match.group(2)))
+            if not durations:
+                print(f"{memory_mb} MB: no REPORT lines found, skipping")
+                continue
+            results.append(summarize(memory_mb, durations, billed, price_gb_s, args.price_request))
+            print(f"{memory_mb} MB: p50 {results[-1]['p50_ms']} ms over {len(durations)} invokes")
+    finally:
+        client.update_function_configuration(FunctionName=args.function, MemorySize=original_memory)
+        client.get_waiter("function_updated_v2").wait(FunctionName=args.function)
+    return results
+
+# ----------------------------
+# Report
+# ----------------------------
+
+def report(results, slack, output):
+    if not results:
+        print("No results")
+        return
+    best_p95 = min(r["p95_ms"] for r in results)
+    max_cost = max(r["cost_per_1m_usd"] for r in results)
+    max_p95 = max(r["p95_ms"] for r in results)
+    print(f"\n{'memory':>8}{'p50':>10}{'p95':>10}{'billed':>10}{'$/1M req':>11}  cost / p95")
+    for r in results:
+        cost_bar = "#" * max(1, round(20 * r["cost_per_1m_usd"] / max_cost))
+        latency_bar = "=" * max(1, round(20 * r["p95_ms"] / max_p95))
+        print(f"{r['memory_mb']:>6}MB{r['p50_ms']:>8.1f}ms{r['p95_ms']:>8.1f}ms{r['mean_billed_ms']:>8.1f}ms"
+              f"{r['cost_per_1m_usd']:>11.4f}  {cost_bar:<20} {latency_bar}")
+
+    cheapest = min(results, key=lambda r: r["cost_per_1m_usd"])
+    fastest = min(results, key=lambda r: (r["p95_ms"], r["cost_per_1m_usd"]))
+    # Cheapest size whose p95 is within `slack` of the best p95
+    balanced = min((r for r in results if r["p95_ms"] <= best_p95 * (1 + slack)),
+                   key=lambda r: r["cost_per_1m_usd"])
+    print(f"\ncheapest: {cheapest['memory_mb']} MB   fastest: {fastest['memory_mb']} MB   "
+          f"balanced (p95 within {slack:.0%} of best): {balanced['memory_mb']} MB")
+    if output:
+        with open(output, "w") as f:
+            json.dump({"results": results, "cheapest": cheapest["memory_mb"], "fastest": fastest["memory_mb"],
+                       "balanced": balanced["memory_mb"]}, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--memory", type=int, nargs="+", default=DEFAULT_MEMORY, help="memory sizes in MB")
+    common.add_argument("--invocations", type=int, default=100, help="invocations per memory size")
+    common.add_argument("--events", help="JSONL workload of API Gateway events")
+    common.add_argument("--price-gb-s", type=float, help="price per GB-second (default: by architecture)")
+    common.add_argument("--price-request", type=float, default=PRICE_PER_REQUEST)
+    common.add_argument("--slack", type=float, default=0.10,
+                        help="p95 tolerance for the balanced pick (default 0.10)")
+    common.add_argument("--output", help="write the curve as JSON")
+
+    local_parser = sub.add_parser("local", parents=[common], help="estimate from a local replay")
+    local_parser.add_argument("--app", choices=["rds", "dynamodb"], required=True)
+    local_parser.add_argument("--arch", choices=sorted(PRICE_PER_GB_S), default="x86_64")
+    local_parser.add_argument("--cpu-factor", type=float, default=1.0,
+                              help="Lambda vCPU time per local CPU ms (default 1.0)")
+    local_parser.add_argument("--moto-port", type=int, default=5002)
+    local_parser.add_argument("--pg-host", default="localhost")
+    local_parser.add_argument("--pg-port", type=int, default=5432)
+    local_parser.add_argument("--pg-user", default="postgres")
+    local_parser.add_argument("--pg-password", default="postgres")
+    local_parser.add_argument("--pg-database", default="postgres")
+
+    aws_parser = sub.add_parser("aws", parents=[common], help="measure a deployed function")
+    aws_parser.add_argument("--function", required=True)
+    aws_parser.add_argument("--event", help="single JSON event file, when --events is not given")
+
+    args = parser.parse_args()
+    results = local(args) if args.mode == "local" else aws(args)
+    report(results, args.slack, args.output)
+
+if __name__ == "__main__":
+    main()
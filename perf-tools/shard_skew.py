@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Write throughput under skewed traffic, with and without Users write sharding.
+
+A single partition key value takes at most ~1000 WCU/s (1 KB writes), and
+adaptive capacity can isolate a hot key but never lift that cap. When a few
+users get most of the writes, their keys throttle first. Sharding spreads
+each user over N key values (dynamoDB/sharding.py).
+
+simulate  Zipf-distributed writes against a model of the table: every
+          partition key value and every physical partition has its own
+          per-second WCU budget. Keys come from sharding.shard_key and
+          created_at from sharding.format_created_at over simulated time,
+          exactly as add_user builds them.
+aws       Real put_item calls against an existing Users table (HASH user_id,
+          RANGE created_at), SDK retries off, counting throttled writes.
+          Writes to the table you name; use a scratch table.
+
+Examples:
+    python shard_skew.py simulate --rate 20000 --zipf 1.2 --shards 1 2 4 8 16
+    python shard_skew.py aws --table Users_20240101_120000 --shards 1 8 --seconds 30 --threads 64
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "dynamoDB"))
+
+from sharding import created_at_now, format_created_at, shard_key
+
+# Fixed simulated clock origin so runs with the same seed are identical
+SIMULATION_START_NS = 1_700_000_000 * 10 ** 9
+
+def zipf_cum_weights(users, s):
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, users + 1)))
+
+def sample_users(rng, cum_weights, n):
+    total = cum_weights[-1]
+    return [bisect.bisect_left(cum_weights, rng.random() * total) for _ in range(n)]
+
+# ----------------------------
+# Simulation
+# ----------------------------
+
+def simulate(shards, args):
+    rng = random.Random(args.seed)
+    cum_weights = zipf_cum_weights(args.users, args.zipf)
+    tick = 0.1
+    per_tick = int(args.rate * tick)
+    budget = args.partition_wcu * tick / args.item_kb
+    accepted = throttled = 0
+    start_ns = SIMULATION_START_NS
+    for step in range(int(args.seconds / tick)):
+        key_used, partition_used = {}, {}
+        for i, user in enumerate(sample_users(rng, cum_weights, per_tick)):
+            # Writes arrive evenly through the tick, stamped like add_user stamps them
+            created_at = format_created_at(start_ns + int((step + i / per_tick) * tick * 1e9))
+            key = shard_key(str(user), created_at, shards)
+            partition = zlib.crc32(key.encode()) % args.partitions
+            if key_used.get(key, 0) < budget and partition_used.get(partition, 0) < budget:
+                key_used[key] = key_used.get(key, 0) + 1
+                partition_used[partition] = partition_used.get(partition, 0) + 1
+                accepted += 1
+            else:
+                throttled += 1
+    return accepted, throttled
+
+# ----------------------------
+# Live table
+# ----------------------------
+
+def run_aws(shards, args):
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+    client = boto3.client("dynamodb", config=Config(retries={"max_attempts": 1},
+                                                    max_pool_connections=args.threads))
+    cum_weights = zipf_cum_weights(args.users, args.zipf)
+    counts = {"accepted": 0, "throttled": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def writer(worker):
+        rng = random.Random(args.seed + worker)
+        accepted = throttled = 0
+        while time.monotonic() < deadline:
+            user = str(sample_users(rng, cum_weights, 1)[0])
+            created_at = created_at_now()
+            try:
+                client.put_item(TableName=args.table, Item={
+                    "user_id": {"S": shard_key(user, created_at, shards)},
+                    "created_at": {"S": created_at},
+                    "name": {"S": f"user {user}"},
+                })
+                accepted += 1
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("ProvisionedThroughputExceededException",
+                                                       "ThrottlingException"):
+                    raise
+                throttled += 1
+        with lock:
+            counts["accepted"] += accepted
+            counts["throttled"] += throttled
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(writer, range(args.threads)))
+    return counts["accepted"], counts["throttled"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["simulate", "aws"])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--zipf", type=float, default=1.2, help="skew exponent; higher is hotter")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--rate", type=float, default=20_000, help="simulate: offered writes per second")
+    parser.add_argument("--partitions", type=int, default=40, help="simulate: physical partitions")
+    parser.add_argument("--partition-wcu", type=float, default=1000, help="simulate: WCU/s per key and per partition")
+    parser.add_argument("--item-kb", type=float, default=1.0, help="simulate: WCU per write")
+    parser.add_argument("--table", help="aws: Users table to write to")
+    parser.add_argument("--threads", type=int, default=32, help="aws: concurrent writers")
+    args = parser.parse_args()
+    if args.mode == "aws" and not args.table:
+        parser.error("aws mode needs --table")
+
+    cum_weights = zipf_cum_weights(args.users, args.zipf)
+    print(f"Hottest user gets {cum_weights[0] / cum_weights[-1]:.1%} of writes "
+          f"(zipf {args.zipf}, {args.users} users)")
+    print(f"{'shards':>7}{'writes/s':>12}{'throttled':>11}{f'vs {args.shards[0]} shard':>12}")
+    baseline = None
+    for shards in args.shards:
+        accepted, throttled = simulate(shards, args) if args.mode == "simulate" else run_aws(shards, args)
+        rate = accepted / args.seconds
+        baseline = baseline or rate
+        share = throttled / max(accepted + throttled, 1)
+        print(f"{shards:>7}{rate:>12.0f}{share:>11.1%}{rate / baseline:>11.2f}x")
+
+if __name__ == "__main__":
+    main()